@@ -0,0 +1,139 @@
+"""
+Benchmarks `ContainerManager.get_available_containers` against a fake Docker
+API that charges a fixed latency for every call.
+
+The "legacy" run reproduces the previous behaviour: a full (non-sparse)
+`containers.list`, which inspects every container, plus a `top()` call per
+running container to detect `ollama pull`. The "current" run goes through
+ContainerManager, which does one sparse list and in-memory pull lookups.
+
+Usage (from django_server/):
+    python -m benchmarks.container_listing --containers 50 --latency-ms 2
+"""
+
+import argparse
+import statistics
+import time
+
+from container.ContainerManager import ContainerManager
+from docker.models.containers import Container
+
+
+class FakeDockerApi:
+    def __init__(self, container_count: int, latency_ms: float) -> None:
+        self.latency = latency_ms / 1000
+        self.calls = 0
+        self.containers = FakeContainerCollection(self, container_count)
+
+    def ping(self) -> bool:
+        return True
+
+    def call(self) -> None:
+        self.calls += 1
+        time.sleep(self.latency)
+
+
+class FakeContainer(Container):
+    def top(self, *args, **kwargs):
+        self.client.call()  # type: ignore
+
+        return {"Processes": [["root", "1", "ollama serve"]]}
+
+
+class FakeContainerCollection:
+    def __init__(self, api: FakeDockerApi, container_count: int) -> None:
+        self.api = api
+        self.summaries = [
+            {
+                "Id": f"{index:064x}",
+                "Names": [f"/model{index}_7b"],
+                "State": "running" if index % 3 else "exited",
+                "Labels": {
+                    "chatbot.model": f"model{index}",
+                    "chatbot.parameters": "7b",
+                    "chatbot.port": str(11434 + index),
+                },
+                "Ports": [{"PrivatePort": 11434, "PublicPort": 11434 + index}],
+            }
+            for index in range(container_count)
+        ]
+
+    def list(self, all=False, filters=None, sparse=False, **kwargs):
+        self.api.call()
+
+        containers = []
+        for summary in self.summaries:
+            if sparse:
+                attrs = summary
+            else:
+                # Non-sparse listing inspects each container individually.
+                self.api.call()
+                attrs = {
+                    "Id": summary["Id"],
+                    "Name": summary["Names"][0],
+                    "State": {"Status": summary["State"]},
+                    "Config": {
+                        "Env": [
+                            f"{key.removeprefix('chatbot.')}={value}"
+                            for key, value in summary["Labels"].items()
+                        ]
+                    },
+                }
+
+            containers.append(FakeContainer(attrs=attrs, client=self.api))
+
+        return containers
+
+
+def legacy_listing(api: FakeDockerApi) -> list[dict]:
+    mapped_containers = []
+
+    for container in api.containers.list(all=True):
+        status = container.status
+        if status == "running":
+            processes = container.top().get("Processes", [])
+            if any("ollama pull" in process for row in processes for process in row):
+                status = "pulling_model"
+
+        mapped_containers.append(ContainerManager.map_container(container, status=status))
+
+    return mapped_containers
+
+
+def measure(label: str, api: FakeDockerApi, func, repeats: int) -> None:
+    timings = []
+    api.calls = 0
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"{label:>8}: median {statistics.median(timings):8.2f} ms, "
+        f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.2f} ms, "
+        f"{api.calls / repeats:.0f} API calls per listing"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--containers", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    api = FakeDockerApi(args.containers, args.latency_ms)
+    ContainerManager.use_client(api)  # type: ignore
+    manager = ContainerManager()
+
+    print(
+        f"{args.containers} containers, {args.latency_ms} ms per Docker API call, "
+        f"{args.repeats} repeats"
+    )
+    measure("legacy", api, lambda: legacy_listing(api), args.repeats)
+    measure("current", api, manager.get_available_containers, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmarks WebSocket token frames for a streamed answer.
+
+A fake model yields `--chunks` small text chunks, optionally pausing between
+them, and every frame goes through a fake transport that does the per-frame
+work of the server (encode + WebSocket framing) and of the browser
+(`JSON.parse`). The "per-chunk" run sends one full frame per chunk, as the
+consumer used to; the other runs go through `FrameCoalescer`.
+
+Usage (from django_server/):
+    python -m benchmarks.frame_coalescing --chunks 5000 --interval-ms 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+from django_app.frame_coalescer import FrameCoalescer
+
+SAMPLE_CHUNKS = [" the", " quick", " brown", " fox", " jumps", ",", " and", "\n"]
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.frames = 0
+        self.bytes = 0
+        self.text: list[str] = []
+
+    async def send(self, frame: str) -> None:
+        payload = frame.encode()
+        header = struct.pack("!BBQ", 0x81, 127, len(payload))
+
+        self.frames += 1
+        self.bytes += len(header) + len(payload)
+
+        data = json.loads(payload)
+        self.text.append(data.get("message", data.get("m", "")))
+
+
+async def generate_chunks(chunk_count: int, interval: float):
+    for index in range(chunk_count):
+        yield SAMPLE_CHUNKS[index % len(SAMPLE_CHUNKS)]
+
+        if interval:
+            await asyncio.sleep(interval)
+
+
+async def run(
+    chunk_count: int,
+    interval: float,
+    max_bytes: int,
+    max_delay_ms: int,
+    compact: bool,
+) -> tuple[FakeTransport, float, float]:
+    transport = FakeTransport()
+    coalescer = FrameCoalescer(
+        transport.send, max_bytes, max_delay_ms, compact=compact
+    )
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    async for chunk in generate_chunks(chunk_count, interval):
+        await coalescer.add(chunk)
+
+    await coalescer.flush()
+
+    return (
+        transport,
+        time.perf_counter() - wall_start,
+        time.process_time() - cpu_start,
+    )
+
+
+def measure(label: str, args: argparse.Namespace, **options) -> None:
+    transport, wall_time, cpu_time = asyncio.run(
+        run(args.chunks, args.interval_ms / 1000, **options)
+    )
+    expected = "".join(
+        SAMPLE_CHUNKS[index % len(SAMPLE_CHUNKS)] for index in range(args.chunks)
+    )
+    assert "".join(transport.text) == expected
+
+    print(
+        f"{label:>18}: {transport.frames:6d} frames, "
+        f"{transport.frames / wall_time:9.0f} frames/s, "
+        f"{transport.bytes / 1024:8.1f} KiB, "
+        f"CPU {cpu_time * 1000:8.2f} ms ({cpu_time / wall_time:5.1%} of wall)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--interval-ms", type=float, default=0.2)
+    parser.add_argument("--max-bytes", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=int, default=40)
+    args = parser.parse_args()
+
+    print(
+        f"{args.chunks} chunks, {args.interval_ms} ms between chunks, "
+        f"flush at {args.max_bytes} bytes or {args.max_delay_ms} ms"
+    )
+    measure("per-chunk", args, max_bytes=0, max_delay_ms=0, compact=False)
+    measure(
+        "coalesced",
+        args,
+        max_bytes=args.max_bytes,
+        max_delay_ms=args.max_delay_ms,
+        compact=False,
+    )
+    measure(
+        "coalesced+compact",
+        args,
+        max_bytes=args.max_bytes,
+        max_delay_ms=args.max_delay_ms,
+        compact=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
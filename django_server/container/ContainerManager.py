@@ -1,12 +1,120 @@
+import json
+import os
+import re
+import threading
 import time
+import typing
 
 import docker
 import docker.errors
+import requests
 from docker.models.containers import Container
 from docker.models.images import Image
 from docker.models.networks import Network
 from docker.types.containers import DeviceRequest
 
+from . import metrics
+
+CONTAINER_LABEL_PREFIX = "chatbot."
+OLLAMA_READY_TIMEOUT_SECONDS = 60
+OLLAMA_READY_POLL_INTERVAL_SECONDS = 0.5
+MAX_PORT_CONFLICT_RETRIES = 3
+PORT_CONFLICT_ERRORS = ["port is already allocated", "address already in use"]
+REPLICA_SUFFIX_PATTERN = re.compile(r"_r\d+$")
+
+
+class ModelPull:
+    def __init__(self, container_name: str, model: str) -> None:
+        self.container_name = container_name
+        self.model = model
+        self.status = "pulling"
+        self.layers: dict[str, dict[str, int]] = {}
+        self.started_at = time.time()
+
+    @property
+    def completed(self) -> int:
+        return sum(layer["completed"] for layer in self.layers.values())
+
+    @property
+    def total(self) -> int:
+        return sum(layer["total"] for layer in self.layers.values())
+
+    @property
+    def percentage(self) -> int:
+        total = self.total
+
+        return min(int(self.completed * 100 / total), 100) if total else 0
+
+    def update(self, progress: dict[str, typing.Any]) -> None:
+        # One line of the Ollama `/api/pull` stream, e.g.
+        # {"status": "pulling 6a07...", "digest": "sha256:6a07...", "total": 4.7e9, "completed": 1.2e9}
+        self.status = progress.get("status", self.status)
+
+        if digest := progress.get("digest"):
+            self.layers[digest] = {
+                "completed": int(progress.get("completed", 0)),
+                "total": int(progress.get("total", 0)),
+            }
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "container": self.container_name,
+            "model": self.model,
+            "status": self.status,
+            "layers": len(self.layers),
+            "completed": self.completed,
+            "total": self.total,
+            "percentage": self.percentage,
+            "started_at": self.started_at,
+        }
+
+
+class ImagePull:
+    def __init__(self, image: str) -> None:
+        self.image = image
+        self.status = "pulling"
+        self.layers: dict[str, dict[str, typing.Any]] = {}
+        self.started_at = time.time()
+
+    def update(self, progress: dict[str, typing.Any]) -> None:
+        # One event of the Docker `images/create` stream, e.g.
+        # {"status": "Downloading", "id": "a1b2c3", "progressDetail": {"current": 1, "total": 9}}
+        self.status = progress.get("status", self.status)
+
+        if layer_id := progress.get("id"):
+            layer = self.layers.setdefault(
+                layer_id, {"status": "", "current": 0, "total": 0}
+            )
+            layer["status"] = progress.get("status", layer["status"])
+
+            if detail := progress.get("progressDetail"):
+                layer["current"] = int(detail.get("current", layer["current"]))
+                layer["total"] = int(detail.get("total", layer["total"]))
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        completed = sum(layer["current"] for layer in self.layers.values())
+        total = sum(layer["total"] for layer in self.layers.values())
+
+        return {
+            "image": self.image,
+            "status": self.status,
+            "layers": self.layers,
+            "completed": completed,
+            "total": total,
+            "percentage": min(int(completed * 100 / total), 100) if total else 0,
+            "started_at": self.started_at,
+        }
+
+
+class PortAllocator(typing.Protocol):
+    def allocate(
+        self, container_name: str, model: str, parameters: str, replica: int = 0
+    ) -> int: ...
+
+    def mark_conflict(self, port: int) -> None: ...
+
+    def release(self, container_name: str) -> None: ...
+
 
 class ContainerManager:
     CONTAINER_STATUS = {
@@ -17,24 +125,99 @@ class ContainerManager:
         "PULLING_MODEL": "pulling_model",
     }
 
+    HEALTH_CHECK_INTERVAL_SECONDS = 30
+
+    # A single DockerClient is shared by every ContainerManager in the process;
+    # its underlying requests session is thread-safe and pools the socket.
     __client: docker.DockerClient | None = None
+    __client_lock = threading.Lock()
+    __last_health_check: float = 0.0
+    __container_stopped_listeners: list[typing.Callable[[str, str | None], None]] = []
+
+    # In-progress `ollama pull` runs, keyed by container name. Tracking them
+    # here lets the container listing avoid a `top()` call per container.
+    __model_pulls: dict[str, ModelPull] = {}
+    __model_pulls_lock = threading.Lock()
+
+    # Set by `container.port_allocator`, which needs the Django ORM; kept out
+    # of this module so it also works without Django, e.g. in benchmarks.
+    __port_allocator: PortAllocator | None = None
 
     def __init__(self) -> None:
-        self.connect_to_docker()
+        if ContainerManager.__client is None:
+            self.connect_to_docker()
 
     def is_connected(self) -> bool:
-        return self.__client is not None
+        if ContainerManager.__client is None:
+            return False
+
+        if (
+            time.monotonic() - ContainerManager.__last_health_check
+            < ContainerManager.HEALTH_CHECK_INTERVAL_SECONDS
+        ):
+            return True
+
+        return self.check_health()
+
+    def check_health(self) -> bool:
+        if (client := ContainerManager.__client) is None:
+            return False
 
-    def connect_to_docker(self) -> bool:
         try:
-            self.__client = docker.DockerClient()
+            client.ping()
+            ContainerManager.__last_health_check = time.monotonic()
 
             return True
 
         except Exception as e:
-            print(e)
+            print(f"Docker health check failed: {e}")
+            ContainerManager.reset_client(client)
+
             return False
 
+    def connect_to_docker(self) -> bool:
+        with ContainerManager.__client_lock:
+            if ContainerManager.__client is not None:
+                return True
+
+            try:
+                client = docker.DockerClient()
+                client.api.hooks["response"].append(metrics.record_docker_api_call)
+
+                ContainerManager.__client = client
+                ContainerManager.__last_health_check = time.monotonic()
+
+                return True
+
+            except Exception as e:
+                print(e)
+                return False
+
+    @classmethod
+    def reset_client(cls, client: docker.DockerClient | None = None) -> None:
+        with cls.__client_lock:
+            if client is not None and cls.__client is not client:
+                return
+
+            if cls.__client is not None:
+                try:
+                    cls.__client.close()
+
+                except Exception:
+                    pass
+
+            cls.__client = None
+
+    @classmethod
+    def use_client(cls, client: docker.DockerClient) -> None:
+        """
+        Replaces the shared Docker client, e.g. with a fake one in benchmarks.
+        """
+
+        with cls.__client_lock:
+            cls.__client = client
+            cls.__last_health_check = time.monotonic()
+
     def is_ollama_image_pulled(self) -> bool:
         if not self.is_connected() or self.__client is None:
             return False
@@ -47,23 +230,48 @@ class ContainerManager:
         except:
             return False
 
-    def pull_ollama_image(self) -> Image | None:
+    def pull_ollama_image(
+        self, on_progress: typing.Callable[[ImagePull], None] | None = None
+    ) -> Image | None:
         if not self.is_connected() or self.__client is None:
             return None
 
-        return self.__client.images.pull("ollama/ollama", "latest")
+        image_pull = ImagePull("ollama/ollama:latest")
+
+        for progress in self.__client.api.pull(
+            "ollama/ollama", tag="latest", stream=True, decode=True
+        ):
+            if "error" in progress:
+                raise docker.errors.APIError(progress["error"])
+
+            image_pull.update(progress)
+            if on_progress is not None:
+                on_progress(image_pull)
+
+        return self.__client.images.get("ollama/ollama:latest")
 
     def get_available_containers(self) -> list[dict[str, str]]:
         if not self.is_connected() or self.__client is None:
             return []
 
-        all_containers: list[Container] = self.__client.containers.list(
-            all=True, filters={"ancestor": "ollama/ollama:latest"}
-        )
+        all_containers = self.get_ollama_containers()
+
+        # Replicas are listed once, through replica 0, with a running count.
+        running_replicas: dict[str, int] = {}
+        for container in all_containers:
+            if container.status == ContainerManager.CONTAINER_STATUS["RUNNING"]:
+                replica_set = ContainerManager.get_replica_set_name(
+                    ContainerManager.get_container_name(container)
+                )
+                running_replicas[replica_set] = running_replicas.get(replica_set, 0) + 1
 
         mapped_containers = []
 
         for container in all_containers:
+            container_name = ContainerManager.get_container_name(container)
+            if ContainerManager.get_replica_set_name(container_name) != container_name:
+                continue
+
             status = container.status
             if status == ContainerManager.CONTAINER_STATUS[
                 "RUNNING"
@@ -71,11 +279,73 @@ class ContainerManager:
                 status = ContainerManager.CONTAINER_STATUS["PULLING_MODEL"]
 
             mapped_containers.append(
-                ContainerManager.map_container(container, status=status)
+                {
+                    **ContainerManager.map_container(container, status=status),
+                    "replicas": running_replicas.get(container_name, 0),
+                }
             )
 
         return mapped_containers
 
+    def get_ollama_containers(self, running_only: bool = False) -> list[Container]:
+        if not self.is_connected() or self.__client is None:
+            return []
+
+        # `sparse=True` keeps this to a single API call instead of one
+        # `inspect` per container; labels carry what we would read from Env.
+        return self.__client.containers.list(
+            all=not running_only,
+            filters={"ancestor": "ollama/ollama:latest"},
+            sparse=True,
+        )
+
+    def get_replica_containers(
+        self, model: str, parameters: str, running_only: bool = False
+    ) -> list[Container]:
+        """
+        Every container of the model version, replica 0 first, from one
+        sparse listing.
+        """
+
+        all_containers = self.get_ollama_containers(running_only=running_only)
+        replica_set = ContainerManager.get_replica_name(model, parameters)
+
+        return sorted(
+            (
+                container
+                for container in all_containers
+                if ContainerManager.get_replica_set_name(
+                    ContainerManager.get_container_name(container)
+                )
+                == replica_set
+            ),
+            key=lambda container: int(
+                ContainerManager.get_container_environment_variable(
+                    container, "replica"
+                )
+                or 0
+            ),
+        )
+
+    def get_replica_ports(self, model: str, parameters: str) -> list[tuple[str, str]]:
+        """
+        (container name, port) of every replica that can serve chats: running
+        and not pulling its model.
+        """
+
+        replica_ports = []
+
+        for container in self.get_replica_containers(
+            model, parameters, running_only=True
+        ):
+            port = ContainerManager.get_container_environment_variable(container, "port")
+            if port is not None and not ContainerManager.is_pulling_model(container):
+                replica_ports.append(
+                    (ContainerManager.get_container_name(container), port)
+                )
+
+        return replica_ports
+
     def get_container(self, container_name: str) -> Container | None:
         if not self.is_connected() or self.__client is None:
             return None
@@ -90,50 +360,189 @@ class ContainerManager:
             print(f"Error retrieving container: {e}")
             return None
 
-    def run_container(self, ai_model, ai_model_version) -> Container | None:
+    def run_container(
+        self,
+        ai_model,
+        ai_model_version,
+        on_progress: typing.Callable[[ModelPull], None] | None = None,
+        replica: int = 0,
+    ) -> Container | None:
         if not self.is_connected() or self.__client is None:
             return None
 
-        container_name: str = f"{ai_model.model}_{ai_model_version.parameters}"
-        network_name = "chatbot-network"
-        container_port = 11434 + ai_model.id
         parameters = ai_model_version.parameters
+        container_name = ContainerManager.get_replica_name(
+            ai_model.model, parameters, replica
+        )
 
         if (container := self.get_container(container_name)) is not None:
-            if container.status == "running":
+            if container.status != "running":
+                container.start()
+
+        elif (
+            container := self._create_container(
+                container_name, ai_model.model, parameters, replica
+            )
+        ) is None:
+            return None
+
+        if not self.wait_until_ready(container):
+            print(f"Ollama in container {container_name} did not become ready")
+            return None
+
+        # Existing containers are checked too: an earlier pull may have failed
+        # and left the container running without the model.
+        model = f"{ai_model.model}:{parameters}"
+        if not self.has_model(container, model) and not self.pull_model(
+            container, model, on_progress=on_progress
+        ):
+            # A running container without the model would count as serving.
+            self.stop_container(container_name)
+            return None
+
+        return container
+
+    def _create_container(
+        self, container_name: str, model: str, parameters: str, replica: int
+    ) -> Container | None:
+        if self.__client is None:
+            return None
+
+        if (port_allocator := ContainerManager.__port_allocator) is None:
+            print("No port allocator configured")
+            return None
+
+        for _ in range(MAX_PORT_CONFLICT_RETRIES):
+            container_port = port_allocator.allocate(
+                container_name, model, parameters, replica
+            )
+
+            try:
+                container = self.__client.containers.create(
+                    name=container_name,
+                    image="ollama/ollama:latest",
+                    detach=True,
+                    ports={"11434/tcp": container_port},
+                    # Replicas share the model files, so only the first one
+                    # downloads them.
+                    volumes={
+                        f"ollama_{ContainerManager.get_replica_name(model, parameters)}": {
+                            "bind": "/root/.ollama",
+                            "mode": "rw",
+                        }
+                    },
+                    network="chatbot-network",
+                    device_requests=[DeviceRequest(count=-1, capabilities=[["gpu"]])],
+                    hostname=container_name,
+                    environment={
+                        "model": model,
+                        "parameters": parameters,
+                        "port": container_port,
+                        "replica": replica,
+                    },
+                    labels={
+                        f"{CONTAINER_LABEL_PREFIX}model": model,
+                        f"{CONTAINER_LABEL_PREFIX}parameters": parameters,
+                        f"{CONTAINER_LABEL_PREFIX}port": str(container_port),
+                        f"{CONTAINER_LABEL_PREFIX}replica": str(replica),
+                    },
+                )
+
+            except docker.errors.DockerException as e:
+                print(f"Error creating container: {e}")
+                port_allocator.release(container_name)
+                return None
+
+            try:
+                container.start()
                 return container
 
-            container.start()
+            except docker.errors.APIError as e:
+                container.remove(force=True)
+
+                if not any(error in str(e) for error in PORT_CONFLICT_ERRORS):
+                    print(f"Error starting container: {e}")
+                    port_allocator.release(container_name)
+                    return None
 
-            return container
+                # Something outside this app holds the port; try another one.
+                print(f"Port {container_port} is already in use, reallocating")
+                port_allocator.mark_conflict(container_port)
+
+        return None
 
-        self.close_any_container_on_port(str(container_port))
+    def wait_until_ready(
+        self, container: Container, timeout: float = OLLAMA_READY_TIMEOUT_SECONDS
+    ) -> bool:
+        port = ContainerManager.get_container_environment_variable(container, "port")
+        base_url = ContainerManager.get_ollama_base_url(port)
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(f"{base_url}/api/version", timeout=2).ok:
+                    return True
+
+            except requests.exceptions.RequestException:
+                pass
+
+            time.sleep(OLLAMA_READY_POLL_INTERVAL_SECONDS)
+
+        return False
+
+    def has_model(self, container: Container, model: str) -> bool:
+        port = ContainerManager.get_container_environment_variable(container, "port")
+        base_url = ContainerManager.get_ollama_base_url(port)
 
         try:
-            container = self.__client.containers.create(
-                name=container_name,
-                image="ollama/ollama:latest",
-                detach=True,
-                ports={"11434/tcp": container_port},
-                network=network_name,
-                device_requests=[DeviceRequest(count=-1, capabilities=[["gpu"]])],
-                hostname=container_name,
-                environment={
-                    "model": ai_model.model,
-                    "parameters": parameters,
-                    "port": container_port,
-                },
-            )
+            return requests.post(
+                f"{base_url}/api/show", json={"model": model}, timeout=10
+            ).ok
 
-        except docker.errors.DockerException as e:
-            print(f"Error creating container: {e}")
-            return None
+        except requests.exceptions.RequestException:
+            return False
 
-        container.start()
-        time.sleep(2)
-        container.exec_run(f"ollama pull {ai_model.model}:{parameters}")
+    def pull_model(
+        self,
+        container: Container,
+        model: str,
+        on_progress: typing.Callable[[ModelPull], None] | None = None,
+    ) -> bool:
+        container_name = ContainerManager.get_container_name(container)
+        port = ContainerManager.get_container_environment_variable(container, "port")
+        base_url = ContainerManager.get_ollama_base_url(port)
+        model_pull = ContainerManager.start_model_pull(container_name, model)
 
-        return container
+        try:
+            with requests.post(
+                f"{base_url}/api/pull",
+                json={"model": model, "stream": True},
+                stream=True,
+                timeout=(5, None),
+            ) as response:
+                response.raise_for_status()
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+
+                    progress = json.loads(line)
+                    if "error" in progress:
+                        print(f"Error pulling model {model}: {progress['error']}")
+                        return False
+
+                    model_pull.update(progress)
+                    if on_progress is not None:
+                        on_progress(model_pull)
+
+            return model_pull.status == "success"
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error pulling model {model}: {e}")
+            return False
+
+        finally:
+            ContainerManager.finish_model_pull(container_name)
 
     def get_network(self, network_name: str) -> Network | None:
         if not self.is_connected() or self.__client is None:
@@ -160,27 +569,13 @@ class ContainerManager:
             print(f"Error creating network: {e}")
             return None
 
-    def close_any_container_on_port(self, port: str) -> None:
-        if not self.is_connected() or self.__client is None:
-            return None
-
-        all_containers: list[Container] = self.__client.containers.list(
-            all=True, filters={"ancestor": "ollama/ollama:latest"}
-        )
-
-        for container in all_containers:
-            if (
-                ContainerManager.get_container_environment_variable(container, "port")
-                == port
-            ):
-                container.stop()
-
     def stop_container(self, container_name: str) -> None:
         if not self.is_connected() or self.__client is None:
             return
 
         if (container := self.get_container(container_name)) is not None:
             container.stop()
+            ContainerManager.notify_container_stopped(container)
 
     def remove_container(self, container_name: str) -> None:
         if not self.is_connected() or self.__client is None:
@@ -189,22 +584,55 @@ class ContainerManager:
         if (container := self.get_container(container_name)) is not None:
             container.stop()
             container.remove()
+            ContainerManager.notify_container_stopped(container)
 
-    def get_container_port(self, model: str, parameters: str) -> str | None:
-        if not self.is_connected() or self.__client is None:
-            return
+            if ContainerManager.__port_allocator is not None:
+                ContainerManager.__port_allocator.release(container_name)
 
-        container_name = f"{model}_{parameters}"
-        if (
-            container := self.get_container(container_name)
-        ) is None or container.status != "running":
-            return
+    @classmethod
+    def add_container_stopped_listener(
+        cls, listener: typing.Callable[[str, str | None], None]
+    ) -> None:
+        """
+        Registers a callback invoked with (container_name, port) whenever a
+        container is stopped or removed through this manager.
+        """
 
-        container_port = ContainerManager.get_container_environment_variable(
-            container, "port"
-        )
+        if listener not in cls.__container_stopped_listeners:
+            cls.__container_stopped_listeners.append(listener)
+
+    @classmethod
+    def use_port_allocator(cls, port_allocator: PortAllocator) -> None:
+        cls.__port_allocator = port_allocator
 
-        return container_port
+    @classmethod
+    def start_model_pull(cls, container_name: str, model: str) -> ModelPull:
+        with cls.__model_pulls_lock:
+            model_pull = ModelPull(container_name, model)
+            cls.__model_pulls[container_name] = model_pull
+
+            return model_pull
+
+    @classmethod
+    def finish_model_pull(cls, container_name: str) -> None:
+        with cls.__model_pulls_lock:
+            cls.__model_pulls.pop(container_name, None)
+
+    @classmethod
+    def get_model_pull(cls, container_name: str) -> ModelPull | None:
+        return cls.__model_pulls.get(container_name)
+
+    @classmethod
+    def notify_container_stopped(cls, container: Container) -> None:
+        container_name = ContainerManager.get_container_name(container)
+        port = ContainerManager.get_container_environment_variable(container, "port")
+
+        for listener in cls.__container_stopped_listeners:
+            try:
+                listener(container_name, port)
+
+            except Exception as e:
+                print(f"Error in container stopped listener: {e}")
 
     @staticmethod
     def map_container(
@@ -215,7 +643,11 @@ class ContainerManager:
         environment: dict[str, str | None] | None = None,
     ) -> dict[str, str | None]:
         return {
-            "name": container.name or "No name" if name is None else name,
+            "name": (
+                ContainerManager.get_container_name(container) or "No name"
+                if name is None
+                else name
+            ),
             "status": container.status if status is None else status,
             "port": (
                 ContainerManager.get_container_environment_variable(container, "port")
@@ -238,27 +670,78 @@ class ContainerManager:
 
     @staticmethod
     def is_pulling_model(container: Container) -> bool:
-        try:
-            processes = container.top().get("Processes", [])  # type: ignore
-
-            return any(
-                "ollama pull" in process
-                for process_list in processes
-                for process in process_list
+        return (
+            ContainerManager.get_model_pull(
+                ContainerManager.get_container_name(container)
             )
+            is not None
+        )
 
-        except (KeyError, IndexError):
-            return False
+    @staticmethod
+    def get_ollama_base_url(port: str | int | None) -> str:
+        is_docker = os.getenv("DOCKER", "false") == "true"
+        host_name = "host.docker.internal" if is_docker else "localhost"
+
+        return f"http://{host_name}:{port}"
+
+    @staticmethod
+    def get_replica_name(model: str, parameters: str, replica: int = 0) -> str:
+        # Replica 0 keeps the plain name used before replicas existed.
+        if replica == 0:
+            return f"{model}_{parameters}"
+
+        return f"{model}_{parameters}_r{replica}"
+
+    @staticmethod
+    def get_replica_set_name(container_name: str) -> str:
+        return REPLICA_SUFFIX_PATTERN.sub("", container_name)
+
+    @staticmethod
+    def get_container_name(container: Container) -> str:
+        if container.name:
+            return container.name
+
+        # Sparse list results only carry `Names`, e.g. ["/llama3_8b"].
+        names = container.attrs.get("Names") or [""]
+
+        return names[0].lstrip("/")
 
     @staticmethod
     def get_container_environment_variable(
         container: Container, env_variable: str
     ) -> str | None:
-        env_list = container.attrs["Config"]["Env"]
+        if "Config" in container.attrs:
+            env_list = container.attrs["Config"]["Env"]
+
+            for env in env_list:
+                key, value = env.split("=", 1)
+                if key == env_variable:
+                    return value
+
+            return None
+
+        labels = container.attrs.get("Labels") or {}
+        if (label := labels.get(f"{CONTAINER_LABEL_PREFIX}{env_variable}")) is not None:
+            return label
+
+        # Containers created before labels were added: recover the values from
+        # the container name and the published port of the sparse result.
+        if env_variable == "port":
+            return next(
+                (
+                    str(port["PublicPort"])
+                    for port in container.attrs.get("Ports") or []
+                    if port.get("PrivatePort") == 11434 and port.get("PublicPort")
+                ),
+                None,
+            )
 
-        for env in env_list:
-            key, value = env.split("=", 1)
-            if key == env_variable:
-                return value
+        model, _, parameters = ContainerManager.get_container_name(
+            container
+        ).rpartition("_")
+        if env_variable == "model":
+            return model or None
+        if env_variable == "parameters":
+            return parameters or None
 
         return None
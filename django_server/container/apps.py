@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ContainerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'container'
+
+    def ready(self) -> None:
+        # Hands the Mongo-backed port allocator to ContainerManager and hooks
+        # the idle reaper and the pre-warm scheduler into the chat router.
+        from . import port_allocator, prewarm, reaper  # noqa: F401
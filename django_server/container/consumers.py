@@ -0,0 +1,37 @@
+import json
+
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from .jobs import job_manager
+
+
+class ContainerJobConsumer(AsyncWebsocketConsumer):
+    async def connect(self):
+        self.job_id = self.scope["url_route"]["kwargs"]["job_id"]
+        self.job_group_name = f"container_job_{self.job_id}"
+
+        self.user = self.scope["user"]
+        if self.user.is_anonymous or (job := job_manager.get(self.job_id)) is None:
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(  # type: ignore
+            self.job_group_name, self.channel_name
+        )
+        await self.accept()
+
+        # Send the current state so late subscribers do not miss finished jobs.
+        await self.job_update({"job": job.to_dict()})
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(  # type: ignore
+            self.job_group_name, self.channel_name
+        )
+
+    async def job_update(self, event):
+        job = event["job"]
+
+        await self.send(text_data=json.dumps(job))
+
+        if job["status"] in ("completed", "failed"):
+            await self.close()
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import threading
+import time
+import typing
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .ContainerManager import ContainerManager, ImagePull, ModelPull
+from .port_cache import port_cache
+from .reaper import reaper
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION_SECONDS = 60 * 60
+PROGRESS_PUBLISH_INTERVAL_SECONDS = 0.5
+
+
+def get_server_loop() -> asyncio.AbstractEventLoop | None:
+    """
+    The event loop serving requests, from itself or from a thread running
+    `sync_to_async` code for it; None elsewhere.
+    """
+
+    try:
+        return asyncio.get_running_loop()
+
+    except RuntimeError:
+        return getattr(SyncToAsync.threadlocal, "main_event_loop", None)
+
+
+class Job:
+    STATUS = {
+        "QUEUED": "queued",
+        "RUNNING": "running",
+        "COMPLETED": "completed",
+        "FAILED": "failed",
+    }
+
+    def __init__(self, kind: str, key: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = Job.STATUS["QUEUED"]
+        self.progress: dict[str, typing.Any] = {}
+        self.result: typing.Any = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.finished = threading.Event()
+
+    @property
+    def group_name(self) -> str:
+        return f"container_job_{self.id}"
+
+    def is_finished(self) -> bool:
+        return self.status in (Job.STATUS["COMPLETED"], Job.STATUS["FAILED"])
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobManager:
+    """
+    Runs long Docker operations (model and image pulls) on a bounded worker
+    pool so HTTP requests can return a job id immediately.
+
+    Jobs are single-flight per key: submitting a key that already has a
+    queued or running job returns that job instead of starting another one.
+    Every state change is published to the `container_job_<id>` channel group.
+    The in-memory channel layer belongs to the server's event loop, so worker
+    threads publish by scheduling on the loop captured when jobs are submitted.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="container-job"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._active: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._last_published: dict[str, float] = {}
+        self._server_loop: asyncio.AbstractEventLoop | None = None
+
+    def submit(
+        self, kind: str, key: str, func: typing.Callable[[Job], typing.Any]
+    ) -> Job:
+        # Jobs submitted from background threads, like the pre-warmer, use the
+        # loop captured by an earlier request.
+        if (loop := get_server_loop()) is not None:
+            self._server_loop = loop
+
+        with self._lock:
+            self._prune()
+
+            if (job := self._active.get(key)) is not None:
+                return job
+
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        self._executor.submit(self._run, job, func)
+
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def get_active(self, key: str) -> Job | None:
+        return self._active.get(key)
+
+    def update_progress(self, job: Job, progress: dict[str, typing.Any]) -> None:
+        job.progress = progress
+        job.updated_at = time.time()
+
+        now = time.monotonic()
+        if now - self._last_published.get(job.id, 0) >= PROGRESS_PUBLISH_INTERVAL_SECONDS:
+            self._publish(job)
+
+    def _run(self, job: Job, func: typing.Callable[[Job], typing.Any]) -> None:
+        self._set_status(job, Job.STATUS["RUNNING"])
+
+        try:
+            job.result = func(job)
+            self._set_status(job, Job.STATUS["COMPLETED"])
+
+        except Exception as e:
+            logger.exception("Container job %s (%s) failed", job.id, job.kind)
+            job.error = str(e)
+            self._set_status(job, Job.STATUS["FAILED"])
+
+        finally:
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+            job.finished.set()
+
+    def _set_status(self, job: Job, status: str) -> None:
+        job.status = status
+        job.updated_at = time.time()
+        self._publish(job)
+
+    def _publish(self, job: Job) -> None:
+        self._last_published[job.id] = time.monotonic()
+
+        loop = self._server_loop
+        if (channel_layer := get_channel_layer()) is None or loop is None:
+            return
+
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                channel_layer.group_send(
+                    job.group_name, {"type": "job.update", "job": job.to_dict()}
+                ),
+                loop,
+            )
+            future.add_done_callback(lambda future: self._on_published(job, future))
+
+        except RuntimeError as e:
+            # The loop was closed, e.g. on shutdown.
+            logger.warning("Failed to publish container job %s: %s", job.id, e)
+
+    def _on_published(self, job: Job, future: Future) -> None:
+        if not future.cancelled() and (error := future.exception()) is not None:
+            logger.warning("Failed to publish container job %s: %s", job.id, error)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+
+        for job_id, job in list(self._jobs.items()):
+            if job.is_finished() and job.updated_at < cutoff:
+                del self._jobs[job_id]
+                self._last_published.pop(job_id, None)
+
+
+job_manager = JobManager(max_workers=settings.CONTAINER_JOB_WORKERS)
+
+
+def get_model_pull_key(model: str, parameters: str) -> str:
+    return f"model_pull:{model}_{parameters}"
+
+
+def submit_model_pull(ai_model, ai_model_version) -> Job:
+    def run(job: Job) -> dict[str, str | None]:
+        def on_progress(model_pull: ModelPull) -> None:
+            job_manager.update_progress(job, model_pull.to_dict())
+
+        # Versions saved before replicas were validated may hold any value.
+        replicas = min(
+            max(ai_model_version.replicas, 1), settings.CONTAINER_MAX_REPLICAS
+        )
+        reaper.ensure_running()
+        reaper.make_room(ai_model.model, ai_model_version.parameters, replicas)
+
+        # Replicas start one after another; they share the model volume, so
+        # only the first one actually downloads the model.
+        containers = []
+        for replica in range(replicas):
+            container = ContainerManager().run_container(
+                ai_model, ai_model_version, on_progress=on_progress, replica=replica
+            )
+            if container is None:
+                raise RuntimeError(f"Failed to start container replica {replica}")
+
+            containers.append(container)
+
+        containers[0].reload()
+        # Replicas that were still pulling when Docker reported them started
+        # were cached as unavailable.
+        port_cache.invalidate(ContainerManager.get_container_name(containers[0]))
+
+        return {
+            **ContainerManager.map_container(containers[0]),
+            "replicas": len(containers),
+        }
+
+    return job_manager.submit(
+        "model_pull",
+        get_model_pull_key(ai_model.model, ai_model_version.parameters),
+        run,
+    )
+
+
+def submit_ollama_image_pull() -> Job:
+    def run(job: Job) -> dict[str, str]:
+        def on_progress(image_pull: ImagePull) -> None:
+            job_manager.update_progress(job, image_pull.to_dict())
+
+        if (image := ContainerManager().pull_ollama_image(on_progress)) is None:
+            raise RuntimeError("Error connecting to Docker")
+
+        return {"image": "ollama/ollama:latest", "id": image.id or ""}
+
+    return job_manager.submit("image_pull", "image_pull:ollama/ollama:latest", run)
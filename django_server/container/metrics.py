@@ -0,0 +1,29 @@
+import contextvars
+
+
+class DockerApiCallCounter:
+    def __init__(self) -> None:
+        self.value = 0
+
+
+_docker_api_calls: contextvars.ContextVar[DockerApiCallCounter | None] = (
+    contextvars.ContextVar("docker_api_calls", default=None)
+)
+
+
+def start_docker_api_call_tracking() -> tuple[DockerApiCallCounter, contextvars.Token]:
+    counter = DockerApiCallCounter()
+
+    return counter, _docker_api_calls.set(counter)
+
+
+def stop_docker_api_call_tracking(token: contextvars.Token) -> None:
+    _docker_api_calls.reset(token)
+
+
+def record_docker_api_call(response, *args, **kwargs):
+    # Installed as a `requests` response hook on the shared Docker API session.
+    if (counter := _docker_api_calls.get()) is not None:
+        counter.value += 1
+
+    return response
@@ -0,0 +1,35 @@
+import logging
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DockerApiCallsMiddleware:
+    """
+    Counts the Docker API calls made while handling a request and reports the
+    total in the `X-Docker-Api-Calls` response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter, token = metrics.start_docker_api_call_tracking()
+
+        try:
+            response = self.get_response(request)
+
+        finally:
+            metrics.stop_docker_api_call_tracking(token)
+
+        response["X-Docker-Api-Calls"] = str(counter.value)
+        if counter.value:
+            logger.debug(
+                "%s %s made %d Docker API calls",
+                request.method,
+                request.path,
+                counter.value,
+            )
+
+        return response
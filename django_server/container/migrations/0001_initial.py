@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('port', models.IntegerField(unique=True)),
+                ('container_name', models.CharField(db_index=True, default='', max_length=255)),
+                ('model', models.TextField(default='')),
+                ('parameters', models.TextField(default='')),
+                ('replica', models.IntegerField(default=0)),
+                ('allocated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
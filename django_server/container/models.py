@@ -1,3 +1,13 @@
-from django.db import models
+from djongo import models
 
 # Create your models here.
+
+
+class PortAllocation(models.Model):
+    port = models.IntegerField(unique=True)
+    # Empty for ports found taken by something this app did not start.
+    container_name = models.CharField(max_length=255, default="", db_index=True)
+    model = models.TextField(default="")
+    parameters = models.TextField(default="")
+    replica = models.IntegerField(default=0)
+    allocated_at = models.DateTimeField(auto_now_add=True)
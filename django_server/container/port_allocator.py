@@ -0,0 +1,175 @@
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+from helpers.db import is_duplicate_key_error
+
+from . import models
+from .ContainerManager import ContainerManager
+
+logger = logging.getLogger(__name__)
+
+MAX_ALLOCATION_ATTEMPTS = 5
+
+
+class PortAllocator:
+    """
+    Hands out host ports for Ollama containers from a fixed range and keeps
+    the assignments in Mongo, so every model version and replica can run at
+    the same time and keeps its port across restarts.
+
+    Conflicts are found without listing containers: the unique index on the
+    port settles races between allocations, and a port Docker refuses to
+    bind is recorded as taken for `CONTAINER_PORT_CONFLICT_TTL` seconds.
+
+    Under djongo a broken unique index raises a ValueError rather than
+    IntegrityError, so writes check `is_duplicate_key_error` instead.
+    """
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+        self._adopted = False
+        self._lock = threading.Lock()
+
+    def get_port(self, container_name: str) -> int | None:
+        allocation = models.PortAllocation.objects.filter(
+            container_name=container_name
+        ).first()
+
+        return allocation.port if allocation is not None else None
+
+    def allocate(
+        self, container_name: str, model: str, parameters: str, replica: int = 0
+    ) -> int:
+        self._adopt_existing_containers()
+
+        if (port := self.get_port(container_name)) is not None:
+            return port
+
+        self._expire_conflicts()
+
+        for _ in range(MAX_ALLOCATION_ATTEMPTS):
+            used_ports = set(
+                models.PortAllocation.objects.values_list("port", flat=True)
+            )
+            port = next(
+                (
+                    port
+                    for port in range(self.start, self.end + 1)
+                    if port not in used_ports
+                ),
+                None,
+            )
+            if port is None:
+                raise RuntimeError("No free container ports left")
+
+            try:
+                models.PortAllocation.objects.create(
+                    port=port,
+                    container_name=container_name,
+                    model=model,
+                    parameters=parameters,
+                    replica=replica,
+                )
+
+                return port
+
+            except Exception as e:
+                if not is_duplicate_key_error(e):
+                    raise
+
+                # Another worker took the port first; pick again.
+                continue
+
+        raise RuntimeError("Could not allocate a container port")
+
+    def mark_conflict(self, port: int) -> None:
+        """
+        Records that something outside this app holds the port. Any
+        allocation of it is dropped so the next `allocate` moves on.
+        """
+
+        models.PortAllocation.objects.filter(port=port).delete()
+
+        try:
+            models.PortAllocation.objects.create(port=port)
+
+        except Exception as e:
+            # Recorded by another worker in the meantime.
+            if not is_duplicate_key_error(e):
+                raise
+
+    def release(self, container_name: str) -> None:
+        models.PortAllocation.objects.filter(container_name=container_name).delete()
+
+    def _expire_conflicts(self) -> None:
+        cutoff = timezone.now() - datetime.timedelta(
+            seconds=settings.CONTAINER_PORT_CONFLICT_TTL
+        )
+        models.PortAllocation.objects.filter(
+            container_name="", allocated_at__lt=cutoff
+        ).delete()
+
+    def _adopt_existing_containers(self) -> None:
+        # Containers started before the allocator existed hold ports it does
+        # not know about; record them once per process.
+        if self._adopted:
+            return
+
+        with self._lock:
+            if self._adopted:
+                return
+
+            recorded_ports = set(
+                models.PortAllocation.objects.values_list("port", flat=True)
+            )
+
+            for container in ContainerManager().get_ollama_containers():
+                port = ContainerManager.get_container_environment_variable(
+                    container, "port"
+                )
+                if port is None or int(port) in recorded_ports:
+                    continue
+
+                try:
+                    models.PortAllocation.objects.create(
+                        port=int(port),
+                        container_name=ContainerManager.get_container_name(
+                            container
+                        ),
+                        model=ContainerManager.get_container_environment_variable(
+                            container, "model"
+                        )
+                        or "",
+                        parameters=ContainerManager.get_container_environment_variable(
+                            container, "parameters"
+                        )
+                        or "",
+                        replica=int(
+                            ContainerManager.get_container_environment_variable(
+                                container, "replica"
+                            )
+                            or 0
+                        ),
+                    )
+
+                except Exception as e:
+                    # Adoption is best effort; it must not block allocations.
+                    if not is_duplicate_key_error(e):
+                        logger.warning(
+                            "Could not record port %s of an existing container: %s",
+                            port,
+                            e,
+                        )
+
+            self._adopted = True
+
+
+port_allocator = PortAllocator(
+    settings.CONTAINER_PORT_RANGE_START, settings.CONTAINER_PORT_RANGE_END
+)
+
+ContainerManager.use_port_allocator(port_allocator)
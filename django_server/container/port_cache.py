@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+
+import docker
+from django.conf import settings
+
+from .ContainerManager import ContainerManager
+
+logger = logging.getLogger(__name__)
+
+INVALIDATING_EVENTS = ["start", "stop", "die", "destroy"]
+WATCHER_RETRY_DELAY_SECONDS = 5
+
+
+class ContainerPortCache:
+    """
+    Caches `model:parameters -> [(container name, port), ...]` lookups for the
+    running replicas of each model version.
+
+    Entries live for `CONTAINER_PORT_CACHE_TTL` seconds and are dropped early
+    whenever the Docker events stream reports that the backing container was
+    started, stopped, died or destroyed, so the chat hot path does not touch
+    the Docker API while the fleet is stable.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._entries: dict[str, tuple[list[tuple[str, str]], float]] = {}
+        self._lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+
+    def get_replicas(self, model: str, parameters: str) -> list[tuple[str, str]]:
+        self._ensure_watcher()
+
+        replica_set = ContainerManager.get_replica_name(model, parameters)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(replica_set)
+
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+
+        replicas = ContainerManager().get_replica_ports(model, parameters)
+
+        with self._lock:
+            self._entries[replica_set] = (replicas, now)
+
+        return replicas
+
+    def invalidate(self, container_name: str | None = None) -> None:
+        with self._lock:
+            if container_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(
+                    ContainerManager.get_replica_set_name(container_name), None
+                )
+
+    def _ensure_watcher(self) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+
+            self._watcher = threading.Thread(
+                target=self._watch_events, name="container-port-cache", daemon=True
+            )
+            self._watcher.start()
+
+    def _watch_events(self) -> None:
+        while True:
+            try:
+                client = docker.DockerClient()
+                # Events emitted while we were disconnected are lost, so start clean.
+                self.invalidate()
+
+                for event in client.events(
+                    decode=True,
+                    filters={"type": "container", "event": INVALIDATING_EVENTS},
+                ):
+                    container_name = event.get("Actor", {}).get("Attributes", {}).get(
+                        "name"
+                    )
+                    if container_name:
+                        self.invalidate(container_name)
+
+            except Exception as e:
+                logger.warning("Docker events stream interrupted: %s", e)
+
+            self.invalidate()
+            time.sleep(WATCHER_RETRY_DELAY_SECONDS)
+
+
+port_cache = ContainerPortCache(ttl=settings.CONTAINER_PORT_CACHE_TTL)
+
+ContainerManager.add_container_stopped_listener(
+    lambda container_name, port: port_cache.invalidate(container_name)
+)
@@ -0,0 +1,294 @@
+import logging
+import math
+import threading
+import time
+import typing
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from django_app import history_planner
+from django_app.models import AIModel
+
+from . import jobs
+from .ContainerManager import ContainerManager
+from .port_cache import port_cache
+from .reaper import reaper
+from .router import replica_router
+
+logger = logging.getLogger(__name__)
+
+# Loading weights from disk can take minutes for large models.
+KEEP_ALIVE_TIMEOUT_SECONDS = 300
+
+
+class RequestRates:
+    """
+    Exponentially decayed request counts per `model:parameters`, so recent
+    traffic outweighs old traffic without keeping a window of timestamps.
+    """
+
+    def __init__(self, half_life: float) -> None:
+        self.half_life = half_life
+        self._counts: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str) -> None:
+        now = time.monotonic()
+
+        with self._lock:
+            self._counts[key] = (self._decay(key, now) + 1, now)
+
+    def get_rates(self) -> dict[str, float]:
+        """
+        Requests per minute of every version seen, estimated from the
+        decayed counts.
+        """
+
+        now = time.monotonic()
+        per_minute = math.log(2) / self.half_life * 60
+
+        with self._lock:
+            return {key: self._decay(key, now) * per_minute for key in self._counts}
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._counts.pop(key, None)
+
+    def _decay(self, key: str, now: float) -> float:
+        if (entry := self._counts.get(key)) is None:
+            return 0.0
+
+        count, updated_at = entry
+
+        return count * 0.5 ** ((now - updated_at) / self.half_life)
+
+
+class FirstTokenCounter:
+    def __init__(self) -> None:
+        self.warm = 0
+        self.cold = 0
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        total = self.warm + self.cold
+
+        return {
+            "warm": self.warm,
+            "cold": self.cold,
+            "hit_rate": self.warm / total if total else None,
+        }
+
+
+class PrewarmScheduler:
+    """
+    Keeps the `CONTAINER_PREWARM_TOP_K` model versions most likely to be
+    asked for loaded in memory. Versions are ranked by their recent request
+    rate, with `AIModel.popularity` breaking ties, which also ranks versions
+    nobody used lately. Only versions with a running container or requests
+    since they were last stopped by hand are considered, so nothing new is
+    downloaded and stopped containers stay stopped.
+
+    Every `CONTAINER_PREWARM_INTERVAL` seconds each target gets an empty
+    generation with `CONTAINER_PREWARM_KEEP_ALIVE`, which loads the weights
+    and keeps Ollama from unloading them, and counts as use for the idle
+    reaper. Stopped targets are started when they fit the memory budget.
+
+    Whether a chat found its model loaded is told by Ollama's load duration
+    on the last chunk, counted as warm or cold per version.
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        interval: float,
+        keep_alive: str,
+        rate_half_life: float,
+        cold_load_ms: float,
+    ) -> None:
+        self.top_k = top_k
+        self.interval = interval
+        self.keep_alive = keep_alive
+        self.cold_load_ms = cold_load_ms
+        self.rates = RequestRates(rate_half_life)
+        self._targets: list[str] = []
+        self._first_tokens: dict[str, FirstTokenCounter] = {}
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def ensure_running(self) -> None:
+        if self.top_k <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(
+                target=self._run, name="container-prewarm", daemon=True
+            )
+            self._thread.start()
+
+    def record_request(self, model: str, parameters: str) -> None:
+        self.rates.record(f"{model}:{parameters}")
+        self.ensure_running()
+
+    def forget(self, model: str, parameters: str) -> None:
+        self.rates.forget(f"{model}:{parameters}")
+
+    def record_first_token(self, model: str, load_duration_ns: int) -> None:
+        """
+        Counts a generation of `model:parameters` as warm or cold by how
+        long Ollama spent loading the model before it.
+        """
+
+        with self._lock:
+            counter = self._first_tokens.setdefault(model, FirstTokenCounter())
+
+            if load_duration_ns / 1_000_000 >= self.cold_load_ms:
+                counter.cold += 1
+            else:
+                counter.warm += 1
+
+    def get_targets(self) -> list[tuple[AIModel, typing.Any]]:
+        rates = self.rates.get_rates()
+        candidates = {key for key, rate in rates.items() if rate > 0}
+
+        containers = ContainerManager().get_ollama_containers(running_only=True)
+        for container in containers:
+            model = ContainerManager.get_container_environment_variable(container, "model")
+            parameters = ContainerManager.get_container_environment_variable(
+                container, "parameters"
+            )
+            if model is not None and parameters is not None:
+                candidates.add(f"{model}:{parameters}")
+
+        ai_models = {
+            ai_model.model: ai_model
+            for ai_model in AIModel.objects.filter(
+                model__in={key.rsplit(":", 1)[0] for key in candidates}
+            )
+        }
+
+        targets = []
+        for key in candidates:
+            model, parameters = key.rsplit(":", 1)
+            if (ai_model := ai_models.get(model)) is None:
+                continue
+
+            version = next(
+                (
+                    version
+                    for version in ai_model.versions
+                    if version.parameters == parameters
+                ),
+                None,
+            )
+            if version is not None:
+                targets.append(
+                    (rates.get(key, 0.0), ai_model.popularity, ai_model, version)
+                )
+
+        targets.sort(key=lambda target: (target[0], target[1]), reverse=True)
+
+        return [(ai_model, version) for _, _, ai_model, version in targets[: self.top_k]]
+
+    def prewarm(self) -> list[str]:
+        targets = self.get_targets()
+        warmed = []
+
+        with self._lock:
+            self._targets = [
+                f"{ai_model.model}:{version.parameters}" for ai_model, version in targets
+            ]
+
+        for ai_model, version in targets:
+            replicas = port_cache.get_replicas(ai_model.model, version.parameters)
+
+            if len(replicas) < max(version.replicas, 1):
+                if reaper.has_room(ai_model.model, version.parameters, version.replicas):
+                    # Single-flight, so a pull already started is reused.
+                    jobs.submit_model_pull(ai_model, version)
+
+            for container_name, port in replicas:
+                if self._keep_alive(
+                    port,
+                    f"{ai_model.model}:{version.parameters}",
+                    version.context_window or history_planner.DEFAULT_CONTEXT_WINDOW,
+                ):
+                    replica_router.touch(container_name, port)
+                    warmed.append(container_name)
+
+        return warmed
+
+    def get_stats(self) -> dict[str, typing.Any]:
+        rates = self.rates.get_rates()
+
+        with self._lock:
+            total = FirstTokenCounter()
+            for counter in self._first_tokens.values():
+                total.warm += counter.warm
+                total.cold += counter.cold
+
+            return {
+                "top_k": self.top_k,
+                "targets": list(self._targets),
+                **total.to_dict(),
+                "models": {
+                    key: {
+                        "rate_per_minute": rates.get(key, 0.0),
+                        **(
+                            self._first_tokens[key].to_dict()
+                            if key in self._first_tokens
+                            else FirstTokenCounter().to_dict()
+                        ),
+                    }
+                    for key in set(rates) | set(self._first_tokens)
+                },
+            }
+
+    def _keep_alive(self, port: str, model: str, num_ctx: int) -> bool:
+        # An empty prompt loads the model without generating any tokens. The
+        # context size must match the chats', or Ollama reloads the model
+        # for the first one.
+        try:
+            response = requests.post(
+                f"{ContainerManager.get_ollama_base_url(port)}/api/generate",
+                json={
+                    "model": model,
+                    "prompt": "",
+                    "keep_alive": self.keep_alive,
+                    "options": {"num_ctx": num_ctx},
+                },
+                timeout=KEEP_ALIVE_TIMEOUT_SECONDS,
+            )
+
+            return response.ok
+
+        except requests.exceptions.RequestException as e:
+            logger.warning("Failed to pre-warm %s on port %s: %s", model, port, e)
+
+            return False
+
+    def _run(self) -> None:
+        while True:
+            try:
+                close_old_connections()
+                if warmed := self.prewarm():
+                    logger.debug("Pre-warmed containers: %s", ", ".join(warmed))
+
+            except Exception:
+                logger.exception("Container pre-warm failed")
+
+            time.sleep(self.interval)
+
+
+prewarmer = PrewarmScheduler(
+    top_k=settings.CONTAINER_PREWARM_TOP_K,
+    interval=settings.CONTAINER_PREWARM_INTERVAL,
+    keep_alive=settings.CONTAINER_PREWARM_KEEP_ALIVE,
+    rate_half_life=settings.CONTAINER_PREWARM_RATE_HALF_LIFE,
+    cold_load_ms=settings.CONTAINER_PREWARM_COLD_LOAD_MS,
+)
+
+replica_router.add_acquire_listener(prewarmer.record_request)
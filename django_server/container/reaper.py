@@ -0,0 +1,286 @@
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django_app.models import AIModel
+
+from .ContainerManager import ContainerManager
+from .router import replica_router
+
+logger = logging.getLogger(__name__)
+
+SIZE_PATTERN = re.compile(r"([\d.]+)\s*([KMGT]?)B", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(size: str) -> int:
+    """
+    Bytes in a size as listed on ollama.com, e.g. "4.7GB" or "815 MB".
+    Unknown formats count as 0.
+    """
+
+    if (match := SIZE_PATTERN.search(size or "")) is None:
+        return 0
+
+    try:
+        return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+    except ValueError:
+        return 0
+
+
+class RunningContainer:
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        parameters: str,
+        size: int,
+        in_flight: int,
+        last_used_at: float,
+        pulling: bool = False,
+    ) -> None:
+        self.name = name
+        self.model = model
+        self.parameters = parameters
+        self.size = size
+        self.in_flight = in_flight
+        self.last_used_at = last_used_at
+        self.pulling = pulling
+
+    def is_in_use(self) -> bool:
+        return bool(self.in_flight) or self.pulling
+
+
+class ContainerReaper:
+    """
+    Stops Ollama containers that served no chat for `CONTAINER_IDLE_TTL`
+    seconds and, when starting a model would push the summed model sizes of
+    running containers past `CONTAINER_MEMORY_BUDGET_GB`, stops the least
+    recently used ones first. Containers with requests in flight or a model
+    download running are never stopped.
+
+    Last use comes from the replica router; containers this process has not
+    routed to yet count as used when the reaper first saw them, or when
+    their download finished.
+    """
+
+    def __init__(
+        self, interval: float, idle_ttl: float, memory_budget: int
+    ) -> None:
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self._first_seen: dict[str, float] = {}
+        # Held while containers are listed and stopped; the thread lock stays
+        # separate so the chat path never waits on a slow reap.
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def ensure_running(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(
+                target=self._run, name="container-reaper", daemon=True
+            )
+            self._thread.start()
+
+    def reap(self) -> list[str]:
+        with self._lock:
+            containers = self._get_running_containers()
+            stopped = []
+
+            if self.idle_ttl > 0:
+                cutoff = time.time() - self.idle_ttl
+
+                for container in containers:
+                    if (
+                        not container.is_in_use()
+                        and container.last_used_at < cutoff
+                        and self._stop(container)
+                    ):
+                        stopped.append(container.name)
+
+            containers = [
+                container for container in containers if container.name not in stopped
+            ]
+
+            return stopped + self._evict(containers, needed=0)
+
+    def make_room(self, model: str, parameters: str, replicas: int = 1) -> list[str]:
+        """
+        Stops least recently used containers of other model versions until
+        `replicas` containers of this one fit in the memory budget.
+        """
+
+        if self.memory_budget <= 0:
+            return []
+
+        with self._lock:
+            containers = self._get_running_containers()
+            running = sum(
+                1
+                for container in containers
+                if container.model == model and container.parameters == parameters
+            )
+            needed = get_version_size(model, parameters) * max(replicas - running, 0)
+
+            return self._evict(containers, needed, keep=(model, parameters))
+
+    def has_room(self, model: str, parameters: str, replicas: int = 1) -> bool:
+        if self.memory_budget <= 0:
+            return True
+
+        with self._lock:
+            containers = self._get_running_containers()
+            running = sum(
+                1
+                for container in containers
+                if container.model == model and container.parameters == parameters
+            )
+            needed = get_version_size(model, parameters) * max(replicas - running, 0)
+
+            return (
+                sum(container.size for container in containers) + needed
+                <= self.memory_budget
+            )
+
+    def _evict(
+        self,
+        containers: list[RunningContainer],
+        needed: int,
+        keep: tuple[str, str] | None = None,
+    ) -> list[str]:
+        if self.memory_budget <= 0:
+            return []
+
+        used = sum(container.size for container in containers)
+        stopped = []
+
+        for container in sorted(containers, key=lambda container: container.last_used_at):
+            if used + needed <= self.memory_budget:
+                break
+
+            if (
+                container.is_in_use()
+                or (container.model, container.parameters) == keep
+            ):
+                continue
+
+            if self._stop(container):
+                stopped.append(container.name)
+                used -= container.size
+
+        if used + needed > self.memory_budget:
+            logger.warning(
+                "Running models need %d bytes, over the %d byte memory budget",
+                used + needed,
+                self.memory_budget,
+            )
+
+        return stopped
+
+    def _get_running_containers(self) -> list[RunningContainer]:
+        now = time.time()
+        sizes: dict[tuple[str, str], int] = {}
+        running_containers = []
+        names = set()
+
+        for container in ContainerManager().get_ollama_containers(running_only=True):
+            name = ContainerManager.get_container_name(container)
+            names.add(name)
+            model = ContainerManager.get_container_environment_variable(container, "model")
+            parameters = ContainerManager.get_container_environment_variable(
+                container, "parameters"
+            )
+            if model is None or parameters is None:
+                continue
+
+            if (model, parameters) not in sizes:
+                sizes[(model, parameters)] = get_version_size(model, parameters)
+
+            # The idle clock starts once the model download finished.
+            pulling = ContainerManager.get_model_pull(name) is not None
+            if pulling:
+                self._first_seen[name] = now
+
+            first_seen = self._first_seen.setdefault(name, now)
+            in_flight, last_used_at = replica_router.get_usage(name) or (0, first_seen)
+
+            running_containers.append(
+                RunningContainer(
+                    name,
+                    model,
+                    parameters,
+                    sizes[(model, parameters)],
+                    in_flight,
+                    max(last_used_at, first_seen),
+                    pulling,
+                )
+            )
+
+        # Containers stopped elsewhere start a new idle clock when restarted.
+        for name in set(self._first_seen) - names:
+            del self._first_seen[name]
+
+        return running_containers
+
+    def _stop(self, container: RunningContainer) -> bool:
+        # A chat or a download may have started since the listing.
+        if (usage := replica_router.get_usage(container.name)) is not None and usage[0]:
+            return False
+
+        if ContainerManager.get_model_pull(container.name) is not None:
+            return False
+
+        logger.info("Stopping container %s", container.name)
+        ContainerManager().stop_container(container.name)
+        self._first_seen.pop(container.name, None)
+
+        return True
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+
+            try:
+                close_old_connections()
+                if stopped := self.reap():
+                    logger.info("Reaper stopped containers: %s", ", ".join(stopped))
+
+            except Exception:
+                logger.exception("Container reaper failed")
+
+
+def get_version_size(model: str, parameters: str) -> int:
+    if (ai_model := AIModel.objects.filter(model=model).first()) is None:
+        return 0
+
+    return next(
+        (
+            parse_size(version.size)
+            for version in ai_model.versions
+            if version.parameters == parameters
+        ),
+        0,
+    )
+
+
+reaper = ContainerReaper(
+    interval=settings.CONTAINER_REAPER_INTERVAL,
+    idle_ttl=settings.CONTAINER_IDLE_TTL,
+    memory_budget=int(settings.CONTAINER_MEMORY_BUDGET_GB * 1024**3),
+)
+
+replica_router.add_acquire_listener(
+    lambda model, parameters: reaper.ensure_running()
+)
@@ -0,0 +1,180 @@
+import threading
+import time
+import typing
+
+from .ContainerManager import ContainerManager
+from .port_cache import port_cache
+
+# How long a replica that refused a connection is skipped.
+UNHEALTHY_COOLDOWN_SECONDS = 10
+
+
+class ReplicaState:
+    def __init__(self, container_name: str, port: str) -> None:
+        self.container_name = container_name
+        self.port = port
+        self.in_flight = 0
+        self.last_routed_at = 0.0
+        # Wall-clock time of the last request start or end, for the reaper.
+        self.last_used_at = time.time()
+        self.unhealthy_until = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "container": self.container_name,
+            "port": self.port,
+            "in_flight": self.in_flight,
+            "last_used_at": self.last_used_at,
+            "healthy": self.is_healthy(time.monotonic()),
+        }
+
+
+class Route:
+    """
+    One request routed to a replica. Counts as in flight on that replica
+    until released; usable as a context manager.
+    """
+
+    def __init__(
+        self, router: "ReplicaRouter", replica: ReplicaState, model: str
+    ) -> None:
+        self._router = router
+        self._released = False
+        self.replica = replica
+        self.base_url = ContainerManager.get_ollama_base_url(replica.port)
+        self.model = model
+
+    def release(self) -> None:
+        if self._released:
+            return
+
+        self._released = True
+        self._router._release(self.replica)
+
+    def mark_unhealthy(self) -> None:
+        self._router.mark_unhealthy(self.replica.container_name)
+
+    def __enter__(self) -> "Route":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class ReplicaRouter:
+    """
+    Sends each request to the running replica of its model version with the
+    fewest requests in flight from this process, skipping replicas that
+    recently refused connections.
+    """
+
+    def __init__(self) -> None:
+        self._replicas: dict[str, ReplicaState] = {}
+        self._lock = threading.Lock()
+        self._acquire_listeners: list[typing.Callable[[str, str], None]] = []
+
+    def add_acquire_listener(self, listener: typing.Callable[[str, str], None]) -> None:
+        """
+        Registers a callback invoked with (model, parameters) for every
+        request, before a replica is picked.
+        """
+
+        if listener not in self._acquire_listeners:
+            self._acquire_listeners.append(listener)
+
+    def acquire(
+        self, model: str, parameters: str, exclude: typing.Collection[str] = ()
+    ) -> Route | None:
+        """
+        Routes a request, skipping the replicas named in `exclude`, which a
+        retry of the same request already failed on.
+        """
+
+        if not exclude:
+            for listener in self._acquire_listeners:
+                listener(model, parameters)
+
+        replica_ports = [
+            (container_name, port)
+            for container_name, port in port_cache.get_replicas(model, parameters)
+            if container_name not in exclude
+        ]
+        if not replica_ports:
+            return None
+
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = [
+                self._get_state(container_name, port)
+                for container_name, port in replica_ports
+            ]
+            # With every replica marked unhealthy, trying one beats failing.
+            healthy = [state for state in candidates if state.is_healthy(now)]
+
+            replica = min(
+                healthy or candidates,
+                key=lambda state: (state.in_flight, state.last_routed_at),
+            )
+            replica.in_flight += 1
+            replica.last_routed_at = now
+            replica.last_used_at = time.time()
+
+        return Route(self, replica, f"{model}:{parameters}")
+
+    def get_replica_count(self, model: str, parameters: str) -> int:
+        return len(port_cache.get_replicas(model, parameters))
+
+    def mark_unhealthy(self, container_name: str) -> None:
+        with self._lock:
+            if (state := self._replicas.get(container_name)) is not None:
+                state.unhealthy_until = time.monotonic() + UNHEALTHY_COOLDOWN_SECONDS
+
+        port_cache.invalidate(container_name)
+
+    def touch(self, container_name: str, port: str) -> None:
+        with self._lock:
+            self._get_state(container_name, port).last_used_at = time.time()
+
+    def forget(self, container_name: str) -> None:
+        with self._lock:
+            self._replicas.pop(container_name, None)
+
+    def get_usage(self, container_name: str) -> tuple[int, float] | None:
+        """
+        (requests in flight, last use as a UNIX timestamp) of a replica this
+        process has routed to, or None.
+        """
+
+        with self._lock:
+            if (state := self._replicas.get(container_name)) is None:
+                return None
+
+            return state.in_flight, state.last_used_at
+
+    def get_stats(self) -> list[dict[str, typing.Any]]:
+        with self._lock:
+            return [state.to_dict() for state in self._replicas.values()]
+
+    def _get_state(self, container_name: str, port: str) -> ReplicaState:
+        state = self._replicas.get(container_name)
+        if state is None or state.port != port:
+            state = ReplicaState(container_name, port)
+            self._replicas[container_name] = state
+
+        return state
+
+    def _release(self, replica: ReplicaState) -> None:
+        with self._lock:
+            replica.in_flight = max(replica.in_flight - 1, 0)
+            replica.last_used_at = time.time()
+
+
+replica_router = ReplicaRouter()
+
+ContainerManager.add_container_stopped_listener(
+    lambda container_name, port: replica_router.forget(container_name)
+)
@@ -1,3 +1,84 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from helpers.db import is_duplicate_key_error
+
+from . import models
+from .port_allocator import PortAllocator
+
+
+class FakeContainer:
+    def __init__(self, name: str, port: int) -> None:
+        self.name = name
+        self.attrs = {
+            "Config": {
+                "Env": [
+                    "model=llama3",
+                    "parameters=8b",
+                    f"port={port}",
+                    "replica=0",
+                ]
+            }
+        }
+
+
+class FakeBulkWriteError(Exception):
+    def __init__(self) -> None:
+        super().__init__("batch op errors occurred")
+        self.code = 65
+        self.details = {"writeErrors": [{"code": 11000}]}
+
+
+class DuplicateKeyErrorTests(SimpleTestCase):
+    def test_detects_djongo_wrapped_bulk_write_error(self) -> None:
+        try:
+            try:
+                raise FakeBulkWriteError()
+            except FakeBulkWriteError as e:
+                raise ValueError("FAILED SQL: INSERT ...") from e
+
+        except ValueError as e:
+            self.assertTrue(is_duplicate_key_error(e))
+
+    def test_ignores_other_errors(self) -> None:
+        self.assertFalse(is_duplicate_key_error(ValueError("FAILED SQL: SELECT ...")))
+
+
+class PortAllocatorTests(TestCase):
+    def setUp(self) -> None:
+        self.allocator = PortAllocator(12000, 12009)
+        self.containers = [
+            FakeContainer("llama3_8b", 12000),
+            FakeContainer("llama3_8b_r1", 12001),
+        ]
+        patcher = mock.patch(
+            "container.port_allocator.ContainerManager.get_ollama_containers",
+            return_value=self.containers,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_adoption_twice_with_recorded_ports(self) -> None:
+        models.PortAllocation.objects.create(port=12000, container_name="llama3_8b")
+
+        self.allocator._adopt_existing_containers()
+        self.assertTrue(self.allocator._adopted)
+
+        # A restarted process adopts the same containers again.
+        restarted = PortAllocator(12000, 12009)
+        restarted._adopt_existing_containers()
+
+        self.assertTrue(restarted._adopted)
+        self.assertEqual(
+            sorted(models.PortAllocation.objects.values_list("port", flat=True)),
+            [12000, 12001],
+        )
+
+    def test_allocate_after_adoption_skips_adopted_ports(self) -> None:
+        models.PortAllocation.objects.create(port=12000, container_name="llama3_8b")
+        self.allocator._adopt_existing_containers()
+
+        port = self.allocator.allocate("mistral_7b", "mistral", "7b")
+
+        self.assertEqual(port, 12002)
+        self.assertEqual(self.allocator.allocate("mistral_7b", "mistral", "7b"), 12002)
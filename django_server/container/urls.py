@@ -8,4 +8,6 @@ urlpatterns: list[URLPattern] = [
     path("containers/", views.Containers.as_view(), name="containers"),
     path("ollama-image/", views.OllamaImage.as_view(), name="ollama-image"),
     path("container/<str:model>", views.Container.as_view(), name="container"),
+    path("jobs/<str:job_id>", views.Job.as_view(), name="job"),
+    path("prewarm/", views.Prewarm.as_view(), name="prewarm"),
 ]
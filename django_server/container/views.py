@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from . import jobs, prewarm
 from .ContainerManager import ContainerManager
 
 # Create your views here.
@@ -19,7 +20,7 @@ class Docker(APIView):
 
         docker_client = ContainerManager()
 
-        if not docker_client.is_connected() and not docker_client.connect_to_docker():
+        if not docker_client.check_health() and not docker_client.connect_to_docker():
             return Response(
                 {"error": "Error connecting to Docker"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -82,11 +83,12 @@ class OllamaImage(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        docker_client.pull_ollama_image()
+        # Concurrent callers share the same in-flight pull job.
+        job = jobs.submit_ollama_image_pull()
 
         return Response(
-            {"status": "ollama/ollama image pulled"},
-            status=status.HTTP_200_OK,
+            {"status": "Pulling ollama/ollama image", "job": job.to_dict()},
+            status=status.HTTP_202_ACCEPTED,
         )
 
 
@@ -154,20 +156,31 @@ class Container(APIView):
                 {"error": "Invalid model version"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        container_name = f"{model}_{query_model_params}"
+        replica_ports = docker_client.get_replica_ports(model, query_model_params)
         if (
-            container := docker_client.run_container(ai_model, ai_model_version)
-        ) is None:
+            len(replica_ports) >= max(ai_model_version.replicas, 1)
+            and (container := docker_client.get_container(container_name)) is not None
+        ):
             return Response(
-                {"error": "Failed to start container"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {
+                    "status": "Container is running",
+                    "container": {
+                        **ContainerManager.map_container(container),
+                        "replicas": len(replica_ports),
+                    },
+                },
+                status=status.HTTP_200_OK,
             )
 
+        job = jobs.submit_model_pull(ai_model, ai_model_version)
+
         return Response(
             {
-                "status": "Container is running",
-                "container": ContainerManager.map_container(container),
+                "status": "Container is starting",
+                "job": job.to_dict(),
             },
-            status=status.HTTP_200_OK,
+            status=status.HTTP_202_ACCEPTED,
         )
 
     def delete(self, request, model) -> Response:
@@ -190,10 +203,19 @@ class Container(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        container_name = f"{model}_{query_model_params}"
+        container_names = [
+            ContainerManager.get_container_name(container)
+            for container in docker_client.get_replica_containers(
+                model, query_model_params
+            )
+        ]
+        # Stopped on purpose: pre-warming must not start it again until it is
+        # asked for.
+        prewarm.prewarmer.forget(model, query_model_params)
 
         if query_method == "stop":
-            docker_client.stop_container(container_name)
+            for container_name in container_names:
+                docker_client.stop_container(container_name)
 
             return Response(
                 {"status": "Container stopped"},
@@ -201,7 +223,8 @@ class Container(APIView):
             )
 
         elif query_method == "remove":
-            docker_client.remove_container(container_name)
+            for container_name in container_names:
+                docker_client.remove_container(container_name)
 
             return Response(
                 {"status": "Container removed"},
@@ -213,3 +236,28 @@ class Container(APIView):
                 {"error": "Invalid method: use 'stop' or 'remove'"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class Job(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id) -> Response:
+        # url: /docker/jobs/{job_id}
+
+        if (job := jobs.job_manager.get(job_id)) is None:
+            return Response(
+                {"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(job.to_dict(), status=status.HTTP_200_OK)
+
+
+class Prewarm(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request) -> Response:
+        # url: /docker/prewarm/
+
+        return Response(prewarm.prewarmer.get_stats(), status=status.HTTP_200_OK)
@@ -4,3 +4,4 @@ from . import models
 
 admin.site.register(models.AIModel)
 admin.site.register(models.ChatHistory)
+admin.site.register(models.ChatMessage)
@@ -0,0 +1,231 @@
+import asyncio
+import collections
+import math
+import time
+import typing
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+PositionCallback = typing.Callable[[int], typing.Awaitable[None]]
+
+# Weight of the newest generation time in the running average.
+HOLD_TIME_SMOOTHING = 0.2
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Queue is full, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    def __init__(self, user_id: int, on_position: typing.Optional[PositionCallback]):
+        self.user_id = user_id
+        self.on_position = on_position
+        self.position = 0
+        self.admitted = asyncio.get_running_loop().create_future()
+
+
+class ModelQueue:
+    """
+    Concurrency limit and wait queue of one `model:parameters` version.
+
+    Waiting requests are grouped per user and admitted round-robin across
+    users, so one user sending many messages cannot starve the others.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.active = 0
+        self.queued = 0
+        self.average_hold_time: typing.Optional[float] = None
+        self._waiting: collections.OrderedDict[int, collections.deque[Ticket]] = (
+            collections.OrderedDict()
+        )
+
+    def enqueue(self, ticket: Ticket) -> None:
+        self._waiting.setdefault(ticket.user_id, collections.deque()).append(ticket)
+        self.queued += 1
+
+    def remove(self, ticket: Ticket) -> None:
+        if (tickets := self._waiting.get(ticket.user_id)) is None or ticket not in tickets:
+            return
+
+        tickets.remove(ticket)
+        self.queued -= 1
+
+        if not tickets:
+            del self._waiting[ticket.user_id]
+
+    def admit_next(self) -> None:
+        while self._waiting and self.active < self.max_concurrent:
+            user_id, tickets = next(iter(self._waiting.items()))
+            ticket = tickets.popleft()
+            self.queued -= 1
+
+            # The user goes to the back of the rotation.
+            del self._waiting[user_id]
+            if tickets:
+                self._waiting[user_id] = tickets
+
+            self.active += 1
+            ticket.admitted.set_result(None)
+
+    def get_order(self) -> list[Ticket]:
+        """
+        Waiting tickets in the order they will be admitted.
+        """
+
+        order = []
+        queues = [list(tickets) for tickets in self._waiting.values()]
+        for round_index in range(max((len(tickets) for tickets in queues), default=0)):
+            order.extend(
+                tickets[round_index] for tickets in queues if round_index < len(tickets)
+            )
+
+        return order
+
+    def record_hold_time(self, hold_time: float) -> None:
+        if self.average_hold_time is None:
+            self.average_hold_time = hold_time
+        else:
+            self.average_hold_time += HOLD_TIME_SMOOTHING * (
+                hold_time - self.average_hold_time
+            )
+
+    def get_retry_after(self) -> int:
+        if self.average_hold_time is None:
+            return settings.CHAT_QUEUE_RETRY_AFTER_SECONDS
+
+        # Time until the queue ahead drains at the current admission rate.
+        return max(
+            1,
+            math.ceil(self.average_hold_time * (self.queued + 1) / self.max_concurrent),
+        )
+
+
+class AdmissionController:
+    """
+    Limits how many generations run at once against each model version.
+    Lives on the event loop of the ASGI server, so no locking is needed.
+    """
+
+    def __init__(self) -> None:
+        self._queues: dict[str, ModelQueue] = {}
+
+    def get_queue(self, key: str) -> ModelQueue:
+        if (queue := self._queues.get(key)) is None:
+            queue = ModelQueue(
+                settings.CHAT_MAX_CONCURRENT_PER_MODEL,
+                settings.CHAT_MAX_QUEUED_PER_MODEL,
+            )
+            self._queues[key] = queue
+
+        return queue
+
+    async def acquire(
+        self,
+        key: str,
+        user_id: int,
+        on_position: typing.Optional[PositionCallback] = None,
+        replicas: int = 1,
+    ) -> "Slot":
+        """
+        Waits for a free slot on the model version, which allows
+        `CHAT_MAX_CONCURRENT_PER_MODEL` generations per running replica.
+        Raises `QueueFullError` at once when the wait queue is full.
+        """
+
+        queue = self.get_queue(key)
+        queue.max_concurrent = settings.CHAT_MAX_CONCURRENT_PER_MODEL * max(replicas, 1)
+        # New replicas may have freed room for requests already waiting.
+        queue.admit_next()
+
+        if queue.active < queue.max_concurrent and not queue.queued:
+            queue.active += 1
+            return Slot(self, key)
+
+        if queue.queued >= queue.max_queued:
+            raise QueueFullError(queue.get_retry_after())
+
+        ticket = Ticket(user_id, on_position)
+        queue.enqueue(ticket)
+        await self._publish_positions(queue)
+
+        try:
+            await ticket.admitted
+
+        except asyncio.CancelledError:
+            if ticket.admitted.done() and not ticket.admitted.cancelled():
+                # Admitted just as the wait was cancelled: hand the slot on.
+                self._release(key, None)
+            else:
+                queue.remove(ticket)
+                await self._publish_positions(queue)
+            raise
+
+        return Slot(self, key)
+
+    def _release(self, key: str, hold_time: typing.Optional[float]) -> None:
+        queue = self._queues[key]
+        queue.active -= 1
+
+        if hold_time is not None:
+            queue.record_hold_time(hold_time)
+
+        queue.admit_next()
+        asyncio.ensure_future(self._publish_positions(queue))
+
+    async def _publish_positions(self, queue: ModelQueue) -> None:
+        for position, ticket in enumerate(queue.get_order(), start=1):
+            if ticket.position == position or ticket.on_position is None:
+                continue
+
+            ticket.position = position
+            try:
+                await ticket.on_position(position)
+
+            except Exception:
+                # A closed socket must not break the queue for others.
+                ticket.on_position = None
+
+
+class Slot:
+    def __init__(self, controller: AdmissionController, key: str) -> None:
+        self._controller = controller
+        self._key = key
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+
+        self._released = True
+        self._controller._release(self._key, time.monotonic() - self._acquired_at)
+
+
+controller = AdmissionController()
+
+
+def get_queue_key(model: str, parameters: str) -> str:
+    return f"{model}:{parameters}"
+
+
+def acquire_blocking(key: str, user_id: int, replicas: int = 1) -> Slot:
+    """
+    `AdmissionController.acquire` for sync views. async_to_sync runs it on
+    the server's event loop, so REST requests wait in the same queues as
+    WebSocket chats.
+    """
+
+    return async_to_sync(controller.acquire)(key, user_id, replicas=replicas)
+
+
+def release_blocking(slot: Slot) -> None:
+    async def release() -> None:
+        slot.release()
+
+    async_to_sync(release)()
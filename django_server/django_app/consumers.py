@@ -1,52 +1,227 @@
+import asyncio
 import json
 import logging
+import time
 
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import WebsocketConsumer
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 
-from . import functions
+from container import jobs
+from container.router import replica_router
+
+from . import admission, functions, summarizer
+from .frame_coalescer import FrameCoalescer
 
 logger = logging.getLogger(__name__)
 
 MAX_MESSAGE_LENGTH = 10_000
 MAX_IMAGE_SIZE_BYTES = 5 * 1024 * 1024  # 5 MB
+CONTAINER_STATUS_POLL_SECONDS = 0.5
+
 
+class ChatConsumer(AsyncWebsocketConsumer):
+    async def connect(self):
+        self._generation_task: asyncio.Task | None = None
+        self._connected = False
 
-class ChatConsumer(WebsocketConsumer):
-    def connect(self):
         self.room_name = self.scope["url_route"]["kwargs"]["chat_id"]
         self.room_group_name = f"chat_{self.room_name}"
 
         self.user = self.scope["user"]
         if self.user.is_anonymous:
-            self.close()
+            await self.close()
             return
 
-        async_to_sync(self.channel_layer.group_add)(  # type: ignore
+        await self.channel_layer.group_add(  # type: ignore
             self.room_group_name, self.channel_name
         )
-        self.accept()
+        await self.accept()
+        self._connected = True
+
+    async def disconnect(self, code):
+        # A closed tab must not keep the model busy: stop the generation and
+        # keep the partial answer.
+        self._connected = False
+        await self._cancel_generation()
 
-    def disconnect(self, code):
-        async_to_sync(self.channel_layer.group_discard)(  # type: ignore
+        await self.channel_layer.group_discard(  # type: ignore
             self.room_group_name, self.channel_name
         )
 
-    def _send_error(self, message: str) -> None:
-        self.send(text_data=json.dumps({"error": message, "done": True}))
+    async def _send_error(self, message: str) -> None:
+        await self.send(text_data=json.dumps({"error": message, "done": True}))
+
+    @database_sync_to_async
+    def _load_chat(self, ai_model_value: str):
+        ai_model = functions.get_ai_model(ai_model_value)
+        chat_history = functions.get_chat_history_for_user(
+            self.user, ai_model, self.room_name
+        )
+
+        if ai_model is None or chat_history is None or chat_history.user != self.user:
+            raise ValueError("Invalid model or chat history.")
+
+        history_messages = functions.deserialize_messages(
+            functions.get_unsummarized_messages(chat_history)
+        )
 
-    def receive(self, text_data=None, bytes_data=None):
+        return ai_model, chat_history, history_messages
+
+    @database_sync_to_async
+    def _save_messages(
+        self, ai_model, parameters, chat_history, user_prompt, image, response
+    ):
+        messages = [
+            functions.create_message("user", user_prompt, image),
+            functions.create_message("assistant", response),
+        ]
+        chat_messages = functions.add_messages_to_history(
+            self.user, ai_model, chat_history, messages
+        )
+        summarizer.maybe_schedule(chat_history.id, ai_model.model, parameters)
+
+        return chat_messages[-1]
+
+    async def receive(self, text_data=None, bytes_data=None):
         if text_data is None:
-            self.disconnect(1000)
+            await self.disconnect(1000)
             return
 
         try:
             text_data_json = json.loads(text_data)
         except json.JSONDecodeError:
             logger.warning("Received invalid JSON over WebSocket")
-            self._send_error("Invalid message format.")
+            await self._send_error("Invalid message format.")
             return
 
+        if text_data_json.get("type") == "cancel":
+            await self._cancel_generation()
+            return
+
+        if self._generation_task is not None and not self._generation_task.done():
+            # Not `done`: the running generation is unaffected.
+            await self.send(
+                text_data=json.dumps(
+                    {
+                        "error": "A response is already being generated.",
+                        "busy": True,
+                        "done": False,
+                    }
+                )
+            )
+            return
+
+        # Generation runs as its own task so this consumer keeps receiving
+        # messages, such as a cancel, while the answer streams.
+        self._generation_task = asyncio.create_task(self._generate(text_data_json))
+
+    async def _cancel_generation(self) -> None:
+        task = self._generation_task
+        if task is None or task.done():
+            return
+
+        task.cancel()
+        # Wait for the partial answer to be saved.
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _acquire_slot(
+        self, model: str, parameters: str
+    ) -> admission.Slot | None:
+        try:
+            replicas = await sync_to_async(
+                replica_router.get_replica_count, thread_sensitive=False
+            )(model, parameters)
+
+            return await admission.controller.acquire(
+                admission.get_queue_key(model, parameters),
+                self.user.id,
+                on_position=self._send_queue_position,
+                replicas=replicas,
+            )
+
+        except admission.QueueFullError as e:
+            await self.send(
+                text_data=json.dumps(
+                    {
+                        "error": f"The model is busy. Try again in {e.retry_after} seconds.",
+                        "retry_after": e.retry_after,
+                        "done": True,
+                    }
+                )
+            )
+
+        except asyncio.CancelledError:
+            if self._connected:
+                await self.send(
+                    text_data=json.dumps({"done": True, "cancelled": True})
+                )
+
+        return None
+
+    async def _ensure_container(self, ai_model, parameters: str) -> bool:
+        """
+        Starts the model version when none of its replicas is running and
+        sends status frames until they are up. Chats arriving meanwhile join
+        the same single-flight start job.
+        """
+
+        try:
+            replicas = await sync_to_async(
+                replica_router.get_replica_count, thread_sensitive=False
+            )(ai_model.model, parameters)
+            if replicas:
+                return True
+
+            version = functions.get_version_by_parameters(ai_model, parameters)
+            if version is None:
+                raise ValueError("Invalid model version.")
+
+            job = await sync_to_async(jobs.submit_model_pull, thread_sensitive=False)(
+                ai_model, version
+            )
+            await self._send_status("starting")
+
+            last_percentage = None
+            while not job.is_finished():
+                percentage = job.progress.get("percentage")
+                if percentage is not None and percentage != last_percentage:
+                    last_percentage = percentage
+                    await self._send_status("pulling", percentage)
+
+                await asyncio.sleep(CONTAINER_STATUS_POLL_SECONDS)
+
+            if job.status == jobs.Job.STATUS["FAILED"]:
+                await self._send_error(f"Failed to start the model: {job.error}")
+                return False
+
+            # The weights are read into memory on the first generation.
+            await self._send_status("loading")
+            return True
+
+        except asyncio.CancelledError:
+            # The start job keeps running for other chats.
+            if self._connected:
+                await self.send(
+                    text_data=json.dumps({"done": True, "cancelled": True})
+                )
+
+        return False
+
+    async def _send_status(self, status: str, progress: int | None = None) -> None:
+        frame = {"status": status, "done": False}
+        if progress is not None:
+            frame["progress"] = progress
+
+        await self.send(text_data=json.dumps(frame))
+
+    async def _send_queue_position(self, position: int) -> None:
+        await self.send(
+            text_data=json.dumps({"queue_position": position, "done": False})
+        )
+
+    async def _generate(self, text_data_json: dict) -> None:
         try:
             required_keys = ["message", "ai_model", "ai_model_parameters"]
             if not all(key in text_data_json for key in required_keys):
@@ -57,6 +232,8 @@ class ChatConsumer(WebsocketConsumer):
             ai_model_parameters = text_data_json.get("ai_model_parameters", "")
             image = text_data_json.get("image", "")
             structured_output = text_data_json.get("structured_output", None)
+            compact = bool(text_data_json.get("compact", False))
+            resend_full = bool(text_data_json.get("resend_full", False))
 
             if not user_prompt or not isinstance(user_prompt, str):
                 raise ValueError("Message must be a non-empty string.")
@@ -74,68 +251,181 @@ class ChatConsumer(WebsocketConsumer):
                 if len(image_data) < 2 or len(image_data[1].encode()) > MAX_IMAGE_SIZE_BYTES:
                     raise ValueError("Image exceeds the maximum allowed size of 5 MB.")
 
-            ai_model = functions.get_ai_model(ai_model_value)
-            chat_history = functions.get_chat_history_for_user(
-                self.user, ai_model, self.room_name
+            ai_model, chat_history, history_messages = await self._load_chat(
+                ai_model_value
             )
 
-            if (
-                ai_model is None
-                or chat_history is None
-                or chat_history.user != self.user
-            ):
-                raise ValueError("Invalid model or chat history.")
-
-            history_messages = functions.deserialize_messages(
-                chat_history.history if chat_history else []
+            started_at = time.perf_counter()
+            first_token_at = None
+            context_info = {}
+            usage_info = {}
+            response_chunks: list[str] = []
+            full_response = None
+            cancelled = False
+            coalescer = FrameCoalescer(
+                lambda frame: self.send(text_data=frame),
+                settings.CHAT_FRAME_MAX_BYTES,
+                settings.CHAT_FRAME_MAX_DELAY_MS,
+                compact=compact,
             )
 
-            full_response = ""
-            if structured_output is None:
-                for chunks in functions.stream_bot_response(
-                    ai_model, ai_model_parameters, user_prompt, image, history_messages
-                ):
-                    full_response += chunks
-                    self.send(text_data=json.dumps({"message": chunks, "done": False}))
+            if not await self._ensure_container(ai_model, ai_model_parameters):
+                return
+
+            container_ready_at = time.perf_counter()
+            slot = await self._acquire_slot(ai_model.model, ai_model_parameters)
+            if slot is None:
+                return
+
+            queued_ms = round((time.perf_counter() - container_ready_at) * 1000)
+            try:
+                if structured_output is None:
+                    async for chunks in functions.astream_bot_response(
+                        ai_model,
+                        ai_model_parameters,
+                        user_prompt,
+                        image,
+                        history_messages,
+                        context_info=context_info,
+                        summary=chat_history.summary,
+                        usage_info=usage_info,
+                    ):
+                        if first_token_at is None and chunks:
+                            first_token_at = time.perf_counter()
+
+                        response_chunks.append(chunks)
+                        await coalescer.add(chunks)
+
+                    await coalescer.flush()
+                    full_response = "".join(response_chunks)
+
+                else:
+                    async for update in functions.astream_structured_bot_response(
+                        ai_model,
+                        ai_model_parameters,
+                        user_prompt,
+                        image,
+                        history_messages,
+                        structured_output,
+                        context_info=context_info,
+                        summary=chat_history.summary,
+                        usage_info=usage_info,
+                    ):
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
 
-            else:
-                full_response = functions.stream_structured_bot_response(
+                        if "message" in update:
+                            full_response = update["message"]
+                        else:
+                            await coalescer.add_fields(
+                                update["deltas"], update["fields"]
+                            )
+
+                    await coalescer.flush()
+
+            except functions.BotUnavailableError as e:
+                # A partial answer is not saved; the client drops what it got.
+                coalescer.discard()
+                if self._connected:
+                    await self._send_error(str(e))
+                return
+            except asyncio.CancelledError:
+                # Leaving the stream closes the HTTP response, so Ollama stops
+                # generating right away. Plain answers keep what was streamed;
+                # an unfinished structured answer is not valid JSON.
+                cancelled = True
+                full_response = (
+                    "".join(response_chunks) if structured_output is None else None
+                )
+
+                if self._connected:
+                    await coalescer.flush()
+                else:
+                    coalescer.discard()
+            finally:
+                slot.release()
+
+            if cancelled and not full_response:
+                if self._connected:
+                    await self.send(
+                        text_data=json.dumps({"done": True, "cancelled": True})
+                    )
+                return
+
+            if full_response is None:
+                await self.send(
+                    text_data=json.dumps(
+                        {
+                            "message": "Error: Unable to parse the response.",
+                            "done": True,
+                        }
+                    )
+                )
+                return
+
+            finished_at = time.perf_counter()
+            try:
+                saved_message = await self._save_messages(
                     ai_model,
                     ai_model_parameters,
+                    chat_history,
                     user_prompt,
                     image,
-                    history_messages,
-                    structured_output,
+                    full_response,
                 )
 
-                if full_response is None:
-                    self.send(
-                        text_data=json.dumps(
-                            {
-                                "message": "Error: Unable to parse the response.",
-                                "done": True,
-                            }
-                        )
-                    )
-                    return
-
-            messages = [
-                functions.create_message("user", user_prompt, image),
-                functions.create_message("assistant", full_response),
-            ]
-            functions.add_messages_to_history(
-                self.user, ai_model, chat_history, messages
-            )
-            self.send(text_data=json.dumps({"message": full_response, "done": True}))
+            except Exception:
+                # Database errors are not validation errors: keep their text
+                # out of the client.
+                logger.exception("Failed to save messages of chat %s", chat_history.id)
+                await self._send_error("Failed to save the answer. Please try again.")
+                return
+
+            if not self._connected:
+                return
+
+            # The client already has the streamed text, so by default the final
+            # frame only carries metadata. Structured answers are always resent
+            # because only their fields were streamed.
+            done_frame = {
+                "done": True,
+                "chat_id": chat_history.id,
+                "seq": saved_message.seq,
+                "usage": usage_info,
+                "timings": {
+                    "startup_ms": round((container_ready_at - started_at) * 1000),
+                    "queued_ms": queued_ms,
+                    "first_token_ms": round((first_token_at - started_at) * 1000)
+                    if first_token_at is not None
+                    else None,
+                    "total_ms": round((finished_at - started_at) * 1000),
+                },
+                "context": context_info,
+            }
+            if cancelled:
+                done_frame["cancelled"] = True
+
+            if resend_full or structured_output is not None:
+                done_frame["message"] = full_response
+
+            await self.send(text_data=json.dumps(done_frame))
+
+        except asyncio.CancelledError:
+            # Cancelled while loading the chat or saving the answer; the
+            # streaming and waiting steps report their own cancellation.
+            if self._connected:
+                await self.send(
+                    text_data=json.dumps({"done": True, "cancelled": True})
+                )
 
         except ValueError as e:
             logger.warning("Validation error in WebSocket receive: %s", e)
-            self._send_error(str(e))
+            await self._send_error(str(e))
         except Exception:
             logger.exception("Unexpected error in ChatConsumer.receive")
-            self._send_error("An unexpected error occurred. Please try again.")
+            await self._send_error("An unexpected error occurred. Please try again.")
 
-    def chat_message(self, event):
+    async def chat_message(self, event):
         message = event["message"]
 
-        self.send(text_data=json.dumps({"message": message}))
+        await self.send(text_data=json.dumps({"message": message}))
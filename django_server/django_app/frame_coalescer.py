@@ -0,0 +1,171 @@
+import asyncio
+import json
+import time
+import typing
+
+SendFunction = typing.Callable[[str], typing.Awaitable[None]]
+
+
+def encode_frame(text: str, compact: bool = False) -> str:
+    """
+    Full frames are `{"message": ..., "done": false}`. Compact frames, which
+    clients opt into, drop the constant `done` flag and use a one-letter key.
+    """
+
+    if compact:
+        return json.dumps({"m": text}, separators=(",", ":"))
+
+    return json.dumps({"message": text, "done": False})
+
+
+def encode_fields_frame(deltas: dict[str, str], fields: dict[str, typing.Any]) -> str:
+    """
+    Structured answers stream `deltas`, text appended to string fields, and
+    `fields`, complete values of the other fields.
+    """
+
+    frame: dict[str, typing.Any] = {"done": False}
+    if deltas:
+        frame["deltas"] = deltas
+    if fields:
+        frame["fields"] = fields
+
+    return json.dumps(frame)
+
+
+class FrameCoalescer:
+    """
+    Buffers streamed text, or streamed fields of a structured answer, and
+    sends it as one frame once `max_bytes` are pending or `max_delay_ms`
+    passed since the first pending chunk, whichever comes first. With
+    `max_bytes` or `max_delay_ms` at 0 every chunk is sent as its own frame.
+    """
+
+    def __init__(
+        self,
+        send: SendFunction,
+        max_bytes: int,
+        max_delay_ms: int,
+        compact: bool = False,
+    ) -> None:
+        self._send = send
+        self._max_bytes = max_bytes
+        self._max_delay = max_delay_ms / 1000
+        self._compact = compact
+
+        self._buffer: list[str] = []
+        self._deltas: dict[str, list[str]] = {}
+        self._fields: dict[str, typing.Any] = {}
+        self._buffered_bytes = 0
+        self._first_chunk_time = 0.0
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+
+        self.frames_sent = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bytes > 0 and self._max_delay > 0
+
+    async def add(self, text: str) -> None:
+        if not text:
+            return
+
+        if not self.enabled:
+            await self._send_frame(text)
+            return
+
+        self._start_pending()
+        self._buffer.append(text)
+        await self._add_bytes(len(text.encode()))
+
+    async def add_fields(
+        self, deltas: dict[str, str], fields: dict[str, typing.Any]
+    ) -> None:
+        """
+        Buffers text appended to string fields and complete values of other
+        fields. Deltas of a field are joined and values replace older ones.
+        """
+
+        if not deltas and not fields:
+            return
+
+        if not self.enabled:
+            await self._send_fields_frame(deltas, fields)
+            return
+
+        self._start_pending()
+
+        size = 0
+        for key, delta in deltas.items():
+            self._deltas.setdefault(key, []).append(delta)
+            size += len(delta.encode())
+
+        for key, value in fields.items():
+            self._fields[key] = value
+            size += len(json.dumps(value))
+
+        await self._add_bytes(size)
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        text = "".join(self._buffer)
+        deltas = {key: "".join(delta) for key, delta in self._deltas.items()}
+        fields = self._fields
+        self.discard()
+
+        if text:
+            await self._send_frame(text)
+
+        if deltas or fields:
+            await self._send_fields_frame(deltas, fields)
+
+    def discard(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._buffer.clear()
+        self._deltas = {}
+        self._fields = {}
+        self._buffered_bytes = 0
+
+    def _start_pending(self) -> None:
+        if self._buffer or self._deltas or self._fields:
+            return
+
+        self._first_chunk_time = time.monotonic()
+        self._timer = asyncio.get_running_loop().call_later(
+            self._max_delay, self._flush_on_timer
+        )
+
+    async def _add_bytes(self, size: int) -> None:
+        self._buffered_bytes += size
+
+        if (
+            self._buffered_bytes >= self._max_bytes
+            or time.monotonic() - self._first_chunk_time >= self._max_delay
+        ):
+            await self.flush()
+
+    def _flush_on_timer(self) -> None:
+        # Covers a model that stalls mid-answer: the pending text still goes
+        # out after `max_delay_ms` without waiting for the next chunk.
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    async def _send_frame(self, text: str) -> None:
+        # Keeps frames in order when the timer flush and `add` overlap.
+        async with self._lock:
+            await self._send(encode_frame(text, self._compact))
+            self.frames_sent += 1
+
+    async def _send_fields_frame(
+        self, deltas: dict[str, str], fields: dict[str, typing.Any]
+    ) -> None:
+        async with self._lock:
+            await self._send(encode_fields_frame(deltas, fields))
+            self.frames_sent += 1
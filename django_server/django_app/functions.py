@@ -1,15 +1,36 @@
+import base64
+import datetime
 import json
-import os
 import typing
 
+import httpx
 import requests
-from container.ContainerManager import ContainerManager
+from asgiref.sync import sync_to_async
+from container.prewarm import prewarmer
+from container.router import replica_router
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.db.models.manager import BaseManager
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_ollama import ChatOllama
+from django.utils import timezone
+from pymongo import ReturnDocument
 
-from . import models, serializers
+from . import (
+    history_planner,
+    image_store,
+    models,
+    ollama_clients,
+    partial_json,
+    serializers,
+    structured_schemas,
+)
+
+OMITTED_IMAGE_NOTE = "[An image was attached to this message but is no longer shown.]"
+
+
+class BotUnavailableError(Exception):
+    """
+    No replica of the model could answer, or the answer broke off midway.
+    """
 
 
 def stream_bot_response(
@@ -18,34 +39,103 @@ def stream_bot_response(
     message: str,
     image: str,
     history: typing.List[typing.Dict[str, str]],
+    context_info: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    summary: str = "",
 ) -> typing.Generator[str, None, None]:
-    url_info = _get_ollama_url(model.model, parameters)
-    if url_info is None:
+    route = replica_router.acquire(model.model, parameters)
+    if route is None:
         return None
 
-    base_url, full_model_string = url_info
+    context_window = get_context_window(model, parameters)
 
     try:
-        if image:
-            new_message = _map_history(
-                [{"role": "user", "content": message, "image": image}]
-            )[0]
-        else:
-            new_message = _map_history([{"role": "user", "content": message}])[0]
-
-        messages = _map_history(history) + [new_message]
+        messages = _create_base_messages(
+            message,
+            image,
+            history,
+            context_window,
+            context_info=context_info,
+            summary=summary,
+            history_image_turns=get_history_image_turns(model),
+        )
 
-        llm = ChatOllama(
-            model=full_model_string,
-            base_url=base_url,
+        llm = ollama_clients.get_client(
+            route.base_url, route.model, num_ctx=context_window
         )
 
         for chunk in llm.stream(messages):
+            _record_load_duration(route, chunk)
             yield chunk.text()
 
-    except requests.exceptions.RequestException:
+    except requests.exceptions.RequestException as e:
+        _report_route_error(route, e)
         return
 
+    finally:
+        route.release()
+
+
+async def astream_bot_response(
+    model: models.AIModel,
+    parameters: str,
+    message: str,
+    image: str,
+    history: typing.List[typing.Dict[str, str]],
+    context_info: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    summary: str = "",
+    usage_info: typing.Optional[typing.Dict[str, int]] = None,
+) -> typing.AsyncGenerator[str, None]:
+    """
+    Streams the answer from the least busy replica. A replica that fails
+    before the first token is replaced by the next one; with none left, or
+    once tokens were sent, `BotUnavailableError` is raised.
+    """
+
+    context_window = get_context_window(model, parameters)
+    messages = await sync_to_async(_create_base_messages, thread_sensitive=False)(
+        message,
+        image,
+        history,
+        context_window,
+        context_info=context_info,
+        summary=summary,
+        history_image_turns=get_history_image_turns(model),
+    )
+
+    failed_replicas: list[str] = []
+    while True:
+        route = await sync_to_async(replica_router.acquire, thread_sensitive=False)(
+            model.model, parameters, exclude=failed_replicas
+        )
+        if route is None:
+            raise BotUnavailableError("The model is not available. Please try again.")
+
+        started = False
+        try:
+            llm = ollama_clients.get_client(
+                route.base_url, route.model, num_ctx=context_window
+            )
+
+            async for chunk in llm.astream(messages):
+                _update_usage_info(usage_info, chunk)
+                _record_load_duration(route, chunk)
+                started = True
+                yield chunk.text()
+
+            return
+
+        except httpx.HTTPError as e:
+            _report_route_error(route, e)
+            if started:
+                raise BotUnavailableError(
+                    "The answer was interrupted. Please try again."
+                ) from e
+
+            failed_replicas.append(route.replica.container_name)
+
+        finally:
+            route.release()
+
 
 def ask_bot(
     model: models.AIModel,
@@ -53,9 +143,12 @@ def ask_bot(
     message: str,
     image: str,
     history: typing.List[typing.Dict[str, str]],
+    summary: str = "",
 ) -> typing.Optional[str]:
     chunks = []
-    for chunk in stream_bot_response(model, parameters, message, image, history):
+    for chunk in stream_bot_response(
+        model, parameters, message, image, history, summary=summary
+    ):
         if chunk:
             chunks.append(chunk)
 
@@ -71,55 +164,197 @@ def stream_structured_bot_response(
     structured_output: typing.List[
         typing.Dict[str, typing.Union[str, typing.Optional[str]]]
     ],
+    context_info: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    summary: str = "",
 ) -> typing.Optional[str]:
-    url_info = _get_ollama_url(model.model, parameters)
-    if url_info is None:
+    route = replica_router.acquire(model.model, parameters)
+    if route is None:
         return None
 
-    base_url, full_model_string = url_info
+    context_window = get_context_window(model, parameters)
 
     try:
-        messages = _create_base_messages(message, image, history)
+        schema = structured_schemas.get_schema(structured_output)
+        messages = _create_structured_messages(
+            message,
+            image,
+            history,
+            schema,
+            context_window,
+            context_info,
+            summary,
+            get_history_image_turns(model),
+        )
 
-        json_schema = _build_json_schema(structured_output)
+        llm = ollama_clients.get_client(
+            route.base_url, route.model, num_ctx=context_window
+        )
 
-        parser = JsonOutputParser(pydantic_object=json_schema)
+        response_chunks = []
+        for chunk in llm.stream(messages, format=schema.json_schema):
+            _record_load_duration(route, chunk)
+            response_chunks.append(chunk.text())
 
-        system_message = f"""You must respond with JSON that matches the following schema:
-```json
-{json.dumps(json_schema, indent=2)}
-```
-Your response should be valid JSON only, with no other text or explanation."""
+        return _format_structured_response("".join(response_chunks), schema)
 
-        if image:
-            new_message = _map_history(
-                [{"role": "user", "content": message, "image": image}]
-            )[0]
-        else:
-            new_message = _map_history([{"role": "user", "content": message}])[0]
+    except Exception as e:
+        print(f"Error in structured bot response: {str(e)}")
+        _report_route_error(route, e)
+        return None
+
+    finally:
+        route.release()
+
+
+async def astream_structured_bot_response(
+    model: models.AIModel,
+    parameters: str,
+    message: str,
+    image: str,
+    history: typing.List[typing.Dict[str, str]],
+    structured_output: typing.List[
+        typing.Dict[str, typing.Union[str, typing.Optional[str]]]
+    ],
+    context_info: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    summary: str = "",
+    usage_info: typing.Optional[typing.Dict[str, int]] = None,
+) -> typing.AsyncGenerator[typing.Dict[str, typing.Any], None]:
+    """
+    Streams a structured answer. While tokens arrive it yields
+    `{"deltas": {...}, "fields": {...}}` with the top-level fields that
+    changed: text appended to string fields as they grow, and other fields
+    once complete and matching the schema. It ends with
+    `{"message": <formatted JSON or None on failure>}`.
+    """
+
+    route = await sync_to_async(replica_router.acquire, thread_sensitive=False)(
+        model.model, parameters
+    )
+    if route is None:
+        yield {"message": None}
+        return
 
-        system_msg = {"role": "system", "content": system_message}
-        messages = _map_history(history) + [system_msg] + [new_message]
+    context_window = get_context_window(model, parameters)
 
-        llm = ChatOllama(
-            model=full_model_string,
-            base_url=base_url,
-            format="json",
+    try:
+        schema = structured_schemas.get_schema(structured_output)
+        messages = await sync_to_async(
+            _create_structured_messages, thread_sensitive=False
+        )(
+            message,
+            image,
+            history,
+            schema,
+            context_window,
+            context_info,
+            summary,
+            get_history_image_turns(model),
+        )
+
+        llm = ollama_clients.get_client(
+            route.base_url, route.model, num_ctx=context_window
         )
 
         response_chunks = []
-        for chunk in llm.stream(messages):
+        scanner = partial_json.PartialObjectScanner()
+        sent_fields: dict[str, typing.Any] = {}
+        async for chunk in llm.astream(messages, format=schema.json_schema):
+            _update_usage_info(usage_info, chunk)
+            _record_load_duration(route, chunk)
             response_chunks.append(chunk.text())
 
-        full_response = "".join(response_chunks)
-        parsed_dict = parser.parse(full_response)
-        json_string = json.dumps(parsed_dict, indent=4)
+            deltas, fields = _get_partial_field_updates(
+                scanner, chunk.text(), schema, sent_fields
+            )
+            if deltas or fields:
+                yield {"deltas": deltas, "fields": fields}
 
-        return f"```json\n{json_string}\n```"
+        yield {
+            "message": _format_structured_response("".join(response_chunks), schema)
+        }
 
     except Exception as e:
         print(f"Error in structured bot response: {str(e)}")
-        return None
+        _report_route_error(route, e)
+        yield {"message": None}
+
+    finally:
+        route.release()
+
+
+def _update_usage_info(
+    usage_info: typing.Optional[typing.Dict[str, int]], chunk
+) -> None:
+    # Ollama reports token counts on the last chunk of the stream.
+    if usage_info is None or not (usage := getattr(chunk, "usage_metadata", None)):
+        return
+
+    usage_info.update(
+        {
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        }
+    )
+
+
+def _record_load_duration(route, chunk) -> None:
+    # Ollama reports how long it spent loading the model on the last chunk.
+    metadata = getattr(chunk, "response_metadata", None) or {}
+    if (load_duration := metadata.get("load_duration")) is not None:
+        prewarmer.record_first_token(route.model, load_duration)
+
+
+def _get_partial_field_updates(
+    scanner: partial_json.PartialObjectScanner,
+    text: str,
+    schema: structured_schemas.StructuredSchema,
+    sent_fields: dict[str, typing.Any],
+) -> tuple[dict[str, str], dict[str, typing.Any]]:
+    # Fields are sent once their value ended; strings also while they grow,
+    # as the text appended since the last update.
+    values = {key: scanner.fields[key] for key in scanner.feed(text)}
+
+    key = scanner.current_key
+    if (
+        key is not None
+        and (value := scanner.current_string) is not None
+        and schema.properties.get(key, {}).get("type") == "string"
+    ):
+        values[key] = value
+
+    deltas = {}
+    fields = {}
+    for key, value in values.items():
+        if key not in schema.properties:
+            continue
+
+        if not schema.field_validators[key](value) or sent_fields.get(key) == value:
+            continue
+
+        sent = sent_fields.get(key)
+        if isinstance(value, str) and isinstance(sent, str) and value.startswith(sent):
+            deltas[key] = value[len(sent) :]
+        elif isinstance(value, str) and sent is None:
+            deltas[key] = value
+        else:
+            fields[key] = value
+
+        sent_fields[key] = value
+
+    return deltas, fields
+
+
+def _format_structured_response(
+    response: str, schema: structured_schemas.StructuredSchema
+) -> str:
+    parsed_dict = json.loads(response)
+    if not schema.validate(parsed_dict):
+        raise ValueError("Response does not match the requested schema")
+
+    json_string = json.dumps(parsed_dict, indent=4)
+
+    return f"```json\n{json_string}\n```"
 
 
 def _map_history(history: list[dict[str, str]]) -> list[dict[str, str | list[str]]]:
@@ -128,12 +363,8 @@ def _map_history(history: list[dict[str, str]]) -> list[dict[str, str | list[str
             "role": message.get("role", ""),
             "content": message.get("content", ""),
             **(
-                {
-                    "images": [
-                        image.split(",")[1] if len(image.split(",")) > 1 else image
-                    ]
-                }
-                if (image := message.get("image", ""))
+                {"images": [image_base64]}
+                if (image_base64 := _resolve_image(message.get("image", "")))
                 else {}
             ),
         }
@@ -141,95 +372,161 @@ def _map_history(history: list[dict[str, str]]) -> list[dict[str, str | list[str
     ]
 
 
-def _build_json_schema(structured_output):
-    properties = {}
-    required_fields = []
+def _resolve_image(image: str) -> str:
+    # Stored messages hold an image store reference, which is only read from
+    # disk here, when the Ollama payload is built.
+    if not image:
+        return ""
 
-    valid_simple_types = {"string", "number", "bool", "date"}
+    if image_store.is_reference(image):
+        return image_store.load_base64(image) or ""
 
-    type_mapping = {
-        "string": {"type": "string"},
-        "number": {"type": "number"},
-        "bool": {"type": "boolean"},
-        "date": {"type": "string", "format": "date"},
-    }
+    return image.split(",")[1] if len(image.split(",")) > 1 else image
 
-    for field_spec in structured_output:
-        field_name = field_spec["field"]
-        field_type = field_spec["type"]
-        required_fields.append(field_name)
 
-        if field_type in valid_simple_types:
-            properties[field_name] = type_mapping[field_type].copy()
+def _create_base_messages(
+    message,
+    image,
+    history,
+    context_window=None,
+    system_prompt=None,
+    context_info=None,
+    summary="",
+    history_image_turns=None,
+):
+    new_message = {"role": "user", "content": message}
+    if image:
+        new_message["image"] = image
 
-        elif field_type == "array":
-            if "arrayType" not in field_spec or not field_spec["arrayType"]:
-                array_type = "string"
-            else:
-                array_type = field_spec["arrayType"]
+    system_messages = (
+        [{"role": "system", "content": system_prompt}] if system_prompt else []
+    )
+    # The stored summary stands in for the turns it covers, which the caller
+    # no longer passes in `history`.
+    summary_messages = (
+        [
+            {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{summary}",
+            }
+        ]
+        if summary
+        else []
+    )
 
-            if array_type not in valid_simple_types:
-                array_type = "string"
+    image_bytes_saved = 0
+    if history_image_turns is not None:
+        history, image_bytes_saved = _strip_history_images(history, history_image_turns)
 
-            properties[field_name] = {
-                "type": "array",
-                "items": type_mapping[array_type].copy(),
-            }
+    window = history_planner.plan_history(
+        history, summary_messages + system_messages + [new_message], context_window
+    )
+    if context_info is not None:
+        context_info.update(window.to_dict())
+        context_info["summarized"] = bool(summary)
+        context_info["image_bytes_saved"] = image_bytes_saved
 
-        else:
-            properties[field_name] = {"type": "string"}
+    return _map_history(
+        summary_messages + window.messages + system_messages + [new_message]
+    )
 
-        if "description" in field_spec and field_spec["description"]:
-            properties[field_name]["description"] = field_spec["description"]
 
-    return {
-        "type": "object",
-        "properties": properties,
-        "required": required_fields,
-    }
+def _create_structured_messages(
+    message,
+    image,
+    history,
+    schema,
+    context_window=None,
+    context_info=None,
+    summary="",
+    history_image_turns=None,
+):
+    return _create_base_messages(
+        message,
+        image,
+        history,
+        context_window,
+        system_prompt=schema.system_message,
+        context_info=context_info,
+        summary=summary,
+        history_image_turns=history_image_turns,
+    )
 
 
-def _create_base_messages(message, image, history):
-    if image:
-        new_message = _map_history(
-            [{"role": "user", "content": message, "image": image}]
-        )[0]
-    else:
-        new_message = _map_history([{"role": "user", "content": message}])[0]
+def _strip_history_images(
+    history: list[dict[str, str]], max_image_turns: int
+) -> tuple[list[dict[str, str]], int]:
+    """
+    Keeps images only on the last `max_image_turns` user turns and replaces
+    older ones with a short note, so earlier screenshots are not uploaded and
+    vision-encoded again on every turn. Returns the new history and the
+    number of base64 bytes left out of the prompt.
+    """
+
+    stripped_history = []
+    image_bytes_saved = 0
+    user_turns_seen = 0
+
+    for message in reversed(history):
+        if message.get("role") == "user":
+            user_turns_seen += 1
+
+        if (image := message.get("image")) and user_turns_seen > max_image_turns:
+            image_bytes_saved += _get_image_base64_size(image)
+            message = {
+                **message,
+                "content": f"{message.get('content', '')}\n\n{OMITTED_IMAGE_NOTE}",
+                "image": "",
+            }
 
-    return _map_history(history) + [new_message]
+        stripped_history.append(message)
 
+    stripped_history.reverse()
 
-def _get_ollama_url(model_name, parameters):
-    container_manager = ContainerManager()
-    container_port = container_manager.get_container_port(model_name, parameters)
+    return stripped_history, image_bytes_saved
 
-    if container_port is None:
-        return None
 
-    is_docker = os.getenv("DOCKER", "false") == "true"
-    host_name = "host.docker.internal" if is_docker else "localhost"
-    base_url = f"http://{host_name}:{container_port}"
-    full_model_string = f"{model_name}:{parameters}"
+def _get_image_base64_size(image: str) -> int:
+    if image_store.is_reference(image):
+        return image_store.get_base64_size(image)
+
+    return len(image.split(",", 1)[-1])
+
 
-    return base_url, full_model_string
+def _report_route_error(route, error: Exception) -> None:
+    # A refused connection means the replica is down; route around it.
+    if isinstance(
+        error, (httpx.ConnectError, requests.exceptions.ConnectionError, ConnectionError)
+    ):
+        route.mark_unhealthy()
 
 
 def create_message(role: str, message: str, image: str = "") -> models.Message:
     data_dict = {"role": role, "content": message}
 
     if role == "user" and image:
-        data_dict["image"] = image
+        data_dict["image"] = (
+            image if image_store.is_reference(image) else image_store.save_data_uri(image)
+        )
 
     serializer = serializers.MessageSerializer(data=data_dict)
     serializer.is_valid(raise_exception=True)
 
-    model = models.Message.objects.create(**serializer.validated_data)  # type: ignore
+    model = models.Message(**serializer.validated_data)  # type: ignore
 
     return model
 
 
-def deserialize_messages(messages: list[models.Message]) -> list[dict[str, str]]:
+def get_image_url(request, image: str) -> str:
+    if not image or not image_store.is_reference(image):
+        return image
+
+    return request.build_absolute_uri(image_store.get_image_url(image))
+
+
+def deserialize_messages(
+    messages: typing.Iterable[models.Message | models.ChatMessage],
+) -> list[dict[str, str]]:
     return [
         {
             "role": str(message.role),
@@ -253,6 +550,55 @@ def get_chats_for_user(
     return chats
 
 
+def encode_chat_cursor(last_update_time: datetime.datetime, chat_id: int) -> str:
+    raw = f"{last_update_time.isoformat()}|{chat_id}"
+
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_chat_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        last_update_time, chat_id = raw.rsplit("|", 1)
+
+        return datetime.datetime.fromisoformat(last_update_time), int(chat_id)
+
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def get_chat_list_page(
+    user: User,
+    model: models.AIModel,
+    cursor: typing.Optional[str] = None,
+    limit: int = 50,
+) -> tuple[list[dict[str, typing.Any]], typing.Optional[str]]:
+    """
+    Returns one page of a user's chats, newest first, without loading message
+    bodies, plus the cursor for the next page (None on the last page).
+    """
+
+    chats = get_chats_for_user(user, model).order_by("-last_update_time", "-id")
+
+    if cursor:
+        last_update_time, chat_id = decode_chat_cursor(cursor)
+        chats = chats.filter(
+            Q(last_update_time__lt=last_update_time)
+            | Q(last_update_time=last_update_time, id__lt=chat_id)
+        )
+
+    page = list(chats.values("id", "title", "last_update_time")[: limit + 1])
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_chat_cursor(
+            page[-1]["last_update_time"], page[-1]["id"]
+        )
+
+    return page, next_cursor
+
+
 def get_chat_history_for_user(
     user: User, model: typing.Optional[models.AIModel], chat_id: str
 ) -> models.ChatHistory | None:
@@ -264,25 +610,108 @@ def get_chat_history_for_user(
     return chats.filter(id=chat_id).first()
 
 
+def get_chat_messages(
+    chat_history: models.ChatHistory | None,
+    after_seq: typing.Optional[int] = None,
+) -> list[models.ChatMessage]:
+    if chat_history is None:
+        return []
+
+    messages = models.ChatMessage.objects.filter(chat=chat_history)
+    if after_seq is not None:
+        messages = messages.filter(seq__gt=after_seq)
+
+    return list(messages.order_by("seq"))
+
+
+def get_unsummarized_messages(
+    chat_history: models.ChatHistory | None,
+) -> list[models.ChatMessage]:
+    if chat_history is None:
+        return []
+
+    return get_chat_messages(chat_history, after_seq=chat_history.summary_until_seq)
+
+
+def get_chat_messages_page(
+    chat_history: models.ChatHistory,
+    before: typing.Optional[int] = None,
+    limit: int = 50,
+) -> tuple[list[models.ChatMessage], typing.Optional[int]]:
+    """
+    Returns up to `limit` messages older than seq `before` (the newest ones
+    when `before` is None) in chronological order, plus the `before` value
+    for the next older page (None when there is nothing older).
+    """
+
+    messages = models.ChatMessage.objects.filter(chat=chat_history)
+    if before is not None:
+        messages = messages.filter(seq__lt=before)
+
+    page = list(messages.order_by("-seq")[: limit + 1])
+
+    next_before = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_before = page[-1].seq
+
+    page.reverse()
+
+    return page, next_before
+
+
+def _reserve_seqs(chat_history: models.ChatHistory, count: int) -> int:
+    """
+    Reserves `count` consecutive seqs of the chat with one atomic `$inc` on
+    its counter, so turns saved at the same time (two tabs, or REST and
+    WebSocket) never collide. Returns the first one.
+    """
+
+    document = models.ChatHistory.objects.mongo_find_one_and_update(
+        {"id": chat_history.id},
+        {"$inc": {"next_seq": count}},
+        projection={"next_seq": True},
+        return_document=ReturnDocument.AFTER,
+    )
+
+    return document["next_seq"] - count
+
+
 def add_messages_to_history(
     user: User,
     model: models.AIModel,
     chat_history: models.ChatHistory | None,
     messages: list[models.Message],
-) -> None:
-    if chat_history:
-        chat_history.history.extend(messages)
-        chat_history.save()
-
-    else:
+) -> list[models.ChatMessage]:
+    if chat_history is None:
         chat_history_data: dict[str, typing.Any] = {
             "user": user,
             "ai_model": model,
-            "history": messages,
+            "history": [],
         }
 
         chat_history = models.ChatHistory.objects.create(**chat_history_data)
-        chat_history.save()
+
+    # Messages live in their own collection, so a turn is one small insert
+    # instead of rewriting the whole conversation document.
+    next_seq = _reserve_seqs(chat_history, len(messages))
+    chat_messages = [
+        models.ChatMessage(
+            chat=chat_history,
+            seq=next_seq + offset,
+            role=message.role,
+            content=message.content,
+            image=message.image or "",
+        )
+        for offset, message in enumerate(messages)
+    ]
+    models.ChatMessage.objects.bulk_create(chat_messages)
+
+    models.ChatHistory.objects.filter(id=chat_history.id).update(
+        last_update_time=timezone.now()
+    )
+
+    return chat_messages
 
 
 def get_version_by_parameters(
@@ -295,6 +724,22 @@ def get_version_by_parameters(
     )
 
 
+def get_context_window(model: models.AIModel, parameters: str) -> int:
+    version = get_version_by_parameters(model, parameters)
+
+    return (
+        getattr(version, "context_window", None)
+        or history_planner.DEFAULT_CONTEXT_WINDOW
+    )
+
+
+def get_history_image_turns(model: models.AIModel) -> int:
+    if not model.can_process_image:
+        return 0
+
+    return max(model.history_image_turns, 0)
+
+
 def get_ai_model(value: str) -> typing.Optional[models.AIModel]:
     try:
         ai_model = models.AIModel.objects.filter(model=value).first()
@@ -0,0 +1,113 @@
+import typing
+
+DEFAULT_CONTEXT_WINDOW = 4096
+# Room left in the context window for the model's answer.
+RESPONSE_TOKEN_RESERVE = 1024
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+IMAGE_TOKENS = 768
+
+
+class HistoryWindow:
+    def __init__(
+        self,
+        messages: list[dict[str, str]],
+        dropped: int,
+        estimated_tokens: int,
+        budget: int,
+    ) -> None:
+        self.messages = messages
+        self.dropped = dropped
+        self.estimated_tokens = estimated_tokens
+        self.budget = budget
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "messages": len(self.messages),
+            "dropped": self.dropped,
+            "estimated_tokens": self.estimated_tokens,
+            "budget": self.budget,
+        }
+
+
+def estimate_tokens(message: dict[str, str]) -> int:
+    """
+    Rough token count for one chat message: ~4 characters per token plus a
+    fixed cost for the chat template and for each attached image.
+    """
+
+    tokens = MESSAGE_OVERHEAD_TOKENS + len(message.get("content", "")) // CHARS_PER_TOKEN
+
+    if message.get("image"):
+        tokens += IMAGE_TOKENS
+
+    return tokens
+
+
+def get_history_budget(context_window: typing.Optional[int]) -> int:
+    context_window = context_window or DEFAULT_CONTEXT_WINDOW
+
+    return max(context_window - RESPONSE_TOKEN_RESERVE, context_window // 2)
+
+
+def plan_history(
+    history: list[dict[str, str]],
+    pinned: list[dict[str, str]],
+    context_window: typing.Optional[int] = None,
+) -> HistoryWindow:
+    """
+    Keeps the most recent history messages that fit in the token budget
+    together with the pinned messages (system prompt and the new user turn),
+    which are always sent. Older messages are dropped.
+    """
+
+    budget = get_history_budget(context_window)
+    used_tokens = sum(estimate_tokens(message) for message in pinned)
+
+    kept: list[dict[str, str]] = []
+    for message in reversed(history):
+        message_tokens = estimate_tokens(message)
+        if used_tokens + message_tokens > budget:
+            break
+
+        kept.append(message)
+        used_tokens += message_tokens
+
+    kept.reverse()
+
+    # Do not start the window with an answer whose question was dropped.
+    while kept and kept[0].get("role") == "assistant" and len(kept) < len(history):
+        used_tokens -= estimate_tokens(kept.pop(0))
+
+    return HistoryWindow(
+        messages=kept,
+        dropped=len(history) - len(kept),
+        estimated_tokens=used_tokens,
+        budget=budget,
+    )
+
+
+def plan_oldest(
+    history: list[dict[str, str]],
+    pinned: list[dict[str, str]],
+    context_window: typing.Optional[int] = None,
+) -> list[dict[str, str]]:
+    """
+    The oldest history messages that fit in the token budget together with
+    the pinned messages, for prompts that work through a history in order.
+    """
+
+    budget = get_history_budget(context_window)
+    used_tokens = sum(estimate_tokens(message) for message in pinned)
+
+    kept: list[dict[str, str]] = []
+    for message in history:
+        message_tokens = estimate_tokens(message)
+        if used_tokens + message_tokens > budget:
+            break
+
+        kept.append(message)
+        used_tokens += message_tokens
+
+    return kept
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+import time
+import typing
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+
+REFERENCE_PREFIX = "sha256:"
+URL_TOKEN_SALT = "chat-image"
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+
+def is_reference(value: str) -> bool:
+    return value.startswith(REFERENCE_PREFIX)
+
+
+def get_digest(reference: str) -> str:
+    return reference.removeprefix(REFERENCE_PREFIX)
+
+
+def _get_time_bucket() -> int:
+    return int(time.time()) // settings.IMAGE_URL_MAX_AGE
+
+
+def _sign_bucket(digest: str, bucket: int) -> str:
+    return signing.Signer(salt=URL_TOKEN_SALT).signature(f"{digest}:{bucket}")
+
+
+def get_image_url(reference: str) -> str:
+    """
+    Image URL with a token, since plain <img> tags cannot send the JWT header.
+    The token signs the current `IMAGE_URL_MAX_AGE` time bucket, so the URL
+    stays the same within it and browsers can cache the image.
+    """
+
+    digest = get_digest(reference)
+    bucket = _get_time_bucket()
+
+    return f"/images/{digest}?token={bucket}:{_sign_bucket(digest, bucket)}"
+
+
+def check_url_token(digest: str, token: str) -> bool:
+    """
+    Accepts tokens of the current and the previous bucket, so a URL handed
+    out at the end of a bucket is still valid for `IMAGE_URL_MAX_AGE`.
+    """
+
+    bucket, _, signature = token.partition(":")
+
+    try:
+        bucket = int(bucket)
+
+    except ValueError:
+        return False
+
+    current_bucket = _get_time_bucket()
+    if bucket not in (current_bucket, current_bucket - 1):
+        return False
+
+    return constant_time_compare(signature, _sign_bucket(digest, bucket))
+
+
+def _get_image_path(digest: str) -> Path:
+    if not DIGEST_PATTERN.match(digest):
+        raise ValueError("Invalid image digest")
+
+    return Path(settings.IMAGE_STORE_ROOT) / digest[:2] / digest
+
+
+def save_image(image_bytes: bytes) -> str:
+    """
+    Stores the image under its SHA-256 digest and returns the reference kept
+    on messages. Identical images are written only once.
+    """
+
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    path = _get_image_path(digest)
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            file.write(image_bytes)
+
+        os.replace(file.name, path)
+
+    return f"{REFERENCE_PREFIX}{digest}"
+
+
+def save_data_uri(data_uri: str) -> str:
+    _, _, encoded = data_uri.partition(",")
+
+    try:
+        image_bytes = base64.b64decode(encoded, validate=True)
+
+    except binascii.Error as e:
+        raise ValueError("Invalid base64 image data") from e
+
+    return save_image(image_bytes)
+
+
+def load_image(digest: str) -> typing.Optional[bytes]:
+    try:
+        return _get_image_path(digest).read_bytes()
+
+    except (ValueError, OSError):
+        return None
+
+
+def get_base64_size(reference: str) -> int:
+    try:
+        size = _get_image_path(get_digest(reference)).stat().st_size
+
+    except (ValueError, OSError):
+        return 0
+
+    return 4 * ((size + 2) // 3)
+
+
+def load_base64(reference: str) -> typing.Optional[str]:
+    if (image_bytes := load_image(get_digest(reference))) is None:
+        return None
+
+    return base64.b64encode(image_bytes).decode()
+
+
+def load_data_uri(reference: str) -> typing.Optional[str]:
+    digest = get_digest(reference)
+    if (image_bytes := load_image(digest)) is None:
+        return None
+
+    return f"data:{get_content_type(image_bytes)};base64,{base64.b64encode(image_bytes).decode()}"
+
+
+def get_content_type(image_bytes: bytes) -> str:
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+
+    return next(
+        (
+            content_type
+            for signature, content_type in IMAGE_SIGNATURES
+            if image_bytes.startswith(signature)
+        ),
+        "application/octet-stream",
+    )
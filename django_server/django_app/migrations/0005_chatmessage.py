@@ -0,0 +1,71 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django_app.models
+
+
+def move_history_to_messages(apps, schema_editor):
+    ChatHistory = apps.get_model("django_app", "ChatHistory")
+    ChatMessage = apps.get_model("django_app", "ChatMessage")
+
+    for chat_history in ChatHistory.objects.all():
+        if not chat_history.history:
+            continue
+
+        ChatMessage.objects.bulk_create(
+            [
+                ChatMessage(
+                    chat=chat_history,
+                    seq=seq,
+                    role=message.role,
+                    content=message.content,
+                    image=message.image or "",
+                )
+                for seq, message in enumerate(chat_history.history)
+            ]
+        )
+
+        chat_history.history = []
+        chat_history.save()
+
+
+def move_messages_to_history(apps, schema_editor):
+    ChatHistory = apps.get_model("django_app", "ChatHistory")
+    ChatMessage = apps.get_model("django_app", "ChatMessage")
+    # The embedded array is declared with the concrete Message model.
+    Message = django_app.models.Message
+
+    for chat_history in ChatHistory.objects.all():
+        messages = ChatMessage.objects.filter(chat=chat_history).order_by("seq")
+
+        chat_history.history = list(chat_history.history or []) + [
+            Message(role=message.role, content=message.content, image=message.image)
+            for message in messages
+        ]
+        chat_history.save()
+        messages.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0004_aimodel_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField()),
+                ('role', models.TextField()),
+                ('content', models.TextField()),
+                ('image', models.TextField(default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='django_app.chathistory')),
+            ],
+            options={
+                'unique_together': {('chat', 'seq')},
+            },
+        ),
+        migrations.RunPython(move_history_to_messages, move_messages_to_history),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from django_app import image_store
+
+
+def move_images_to_store(apps, schema_editor):
+    ChatMessage = apps.get_model("django_app", "ChatMessage")
+
+    for message in ChatMessage.objects.filter(image__startswith="data:image/"):
+        message.image = image_store.save_data_uri(message.image)
+        message.save(update_fields=["image"])
+
+
+def move_images_to_messages(apps, schema_editor):
+    ChatMessage = apps.get_model("django_app", "ChatMessage")
+
+    for message in ChatMessage.objects.filter(
+        image__startswith=image_store.REFERENCE_PREFIX
+    ):
+        message.image = image_store.load_data_uri(message.image) or ""
+        message.save(update_fields=["image"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0005_chatmessage'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_images_to_store, move_images_to_messages),
+    ]
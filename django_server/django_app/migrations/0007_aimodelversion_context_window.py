@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0006_chatmessage_image_references'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodelversion',
+            name='context_window',
+            field=models.IntegerField(default=4096),
+        ),
+    ]
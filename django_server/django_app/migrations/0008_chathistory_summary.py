@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0007_aimodelversion_context_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chathistory',
+            name='summary',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='chathistory',
+            name='summary_until_seq',
+            field=models.IntegerField(default=-1),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0008_chathistory_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='history_image_turns',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0009_aimodel_history_image_turns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodelversion',
+            name='replicas',
+            field=models.IntegerField(default=1),
+        ),
+    ]
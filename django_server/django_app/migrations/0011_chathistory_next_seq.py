@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def set_next_seq(apps, schema_editor):
+    ChatHistory = apps.get_model("django_app", "ChatHistory")
+    ChatMessage = apps.get_model("django_app", "ChatMessage")
+
+    for chat_history in ChatHistory.objects.all():
+        last_seq = (
+            ChatMessage.objects.filter(chat_id=chat_history.id)
+            .order_by("-seq")
+            .values_list("seq", flat=True)
+            .first()
+        )
+        ChatHistory.objects.filter(id=chat_history.id).update(
+            next_seq=0 if last_seq is None else last_seq + 1
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_app', '0010_aimodelversion_replicas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chathistory',
+            name='next_seq',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(set_next_seq, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,9 @@ from djongo import models
 class AIModelVersion(models.Model):
     parameters = models.TextField()
     size = models.TextField()
+    context_window = models.IntegerField(default=4096)
+    # Ollama containers started for this version; chats go to the least loaded.
+    replicas = models.IntegerField(default=1)
 
 
 class AIModel(models.Model):
@@ -17,6 +20,8 @@ class AIModel(models.Model):
     can_process_image = models.BooleanField(default=False)
     versions = models.ArrayModelField(model_container=AIModelVersion)
     index = models.IntegerField(default=0)
+    # How many of the latest user turns keep their images when history is replayed.
+    history_image_turns = models.IntegerField(default=1)
 
 
 class Message(models.Model):
@@ -31,3 +36,26 @@ class ChatHistory(models.Model):
     title = models.TextField(default="New chat")
     last_update_time = models.DateTimeField(auto_now=True)
     history = models.ArrayModelField(model_container=Message)
+    # Rolling summary of every message with seq <= summary_until_seq.
+    summary = models.TextField(default="")
+    summary_until_seq = models.IntegerField(default=-1)
+    # Seq of the next message; reserved with an atomic $inc.
+    next_seq = models.IntegerField(default=0)
+
+    # Exposes pymongo methods as `mongo_<name>`.
+    objects = models.DjongoManager()
+
+
+class ChatMessage(models.Model):
+    chat = models.ForeignKey(
+        ChatHistory, on_delete=models.CASCADE, related_name="messages"
+    )
+    seq = models.IntegerField()
+    role = models.TextField()
+    content = models.TextField()
+    image = models.TextField(default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Also serves as the (chat_id, seq) index used to append and page messages.
+        unique_together = [["chat", "seq"]]
@@ -0,0 +1,56 @@
+import threading
+from urllib.parse import urlparse
+
+from container.ContainerManager import ContainerManager
+from langchain_ollama import ChatOllama
+
+
+class OllamaClientRegistry:
+    """
+    Process-wide cache of ChatOllama instances.
+
+    Each ChatOllama owns its own sync and async HTTP clients, so reusing the
+    instance keeps the keep-alive connection to the Ollama container open
+    between chat turns instead of reconnecting on every message.
+
+    Structured output schemas come from users, so they are passed per call
+    (`llm.stream(messages, format=schema)`) instead of being part of the key.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[tuple[str, str, int | None], ChatOllama] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, model: str, num_ctx: int | None = None) -> ChatOllama:
+        key = (base_url, model, num_ctx)
+
+        with self._lock:
+            if (client := self._clients.get(key)) is None:
+                client = ChatOllama(model=model, base_url=base_url, num_ctx=num_ctx)
+                self._clients[key] = client
+
+            return client
+
+    def evict_port(self, port: str | None) -> None:
+        if port is None:
+            return
+
+        with self._lock:
+            for key in list(self._clients):
+                if str(urlparse(key[0]).port) == str(port):
+                    del self._clients[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+registry = OllamaClientRegistry()
+
+ContainerManager.add_container_stopped_listener(
+    lambda container_name, port: registry.evict_port(port)
+)
+
+
+def get_client(base_url: str, model: str, num_ctx: int | None = None) -> ChatOllama:
+    return registry.get(base_url, model, num_ctx)
@@ -0,0 +1,168 @@
+import json
+import typing
+
+STRING_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class PartialObjectScanner:
+    """
+    Follows a JSON object as it is streamed, one chunk at a time. Top-level
+    fields are parsed once their value ends and the string value being
+    written is decoded as it grows, so each chunk only costs its own length
+    instead of re-parsing everything received so far.
+    """
+
+    def __init__(self) -> None:
+        self.fields: dict[str, typing.Any] = {}
+        self.current_key: str | None = None
+        self.closed = False
+        self._started = False
+        self._invalid = False
+        self._depth = 0
+        self._in_value = False
+        self._in_string = False
+        self._escape = False
+        self._unicode: str | None = None
+        # Raw text of the key or value being read.
+        self._raw: list[str] = []
+        # Decoded text of the current value when it is a top-level string,
+        # with the characters not yet joined onto it.
+        self._string: list[str] | None = None
+        self._string_text = ""
+
+    @property
+    def current_string(self) -> str | None:
+        """
+        The string value being written, decoded so far, or None when the
+        current value is not a string.
+        """
+
+        if self._string is None or self.current_key is None:
+            return None
+
+        if self._string:
+            self._string_text += "".join(self._string)
+            self._string.clear()
+
+        return self._string_text
+
+    def feed(self, text: str) -> list[str]:
+        """
+        Consumes the next chunk and returns the keys whose values ended in it.
+        """
+
+        completed = []
+
+        for char in text:
+            if self.closed or self._invalid:
+                break
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                elif not char.isspace():
+                    self._invalid = True
+
+            elif self._in_string:
+                self._read_string_char(char)
+
+            elif not self._in_value:
+                if char == '"':
+                    self._in_string = True
+                    self._raw = [char]
+                elif char == ":" and self.current_key is not None:
+                    self._in_value = True
+                    self._raw = []
+                    self._string = None
+                elif char == "}":
+                    self.closed = True
+
+            elif self._depth == 1 and char in ",}":
+                if self._end_value():
+                    completed.append(typing.cast(str, self.current_key))
+
+                self.current_key = None
+                self.closed = char == "}"
+
+            else:
+                if char == '"':
+                    self._in_string = True
+                    if self._depth == 1 and not "".join(self._raw).strip():
+                        self._string = []
+                        self._string_text = ""
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+
+                self._raw.append(char)
+
+        return completed
+
+    def _read_string_char(self, char: str) -> None:
+        self._raw.append(char)
+
+        if self._unicode is not None:
+            self._unicode += char
+            if len(self._unicode) == 4:
+                try:
+                    self._append_decoded(chr(int(self._unicode, 16)))
+                except ValueError:
+                    pass
+                self._unicode = None
+
+        elif self._escape:
+            self._escape = False
+            if char == "u":
+                self._unicode = ""
+            else:
+                self._append_decoded(STRING_ESCAPES.get(char, char))
+
+        elif char == "\\":
+            self._escape = True
+
+        elif char == '"':
+            self._in_string = False
+            if not self._in_value:
+                self._end_key()
+
+        else:
+            self._append_decoded(char)
+
+    def _append_decoded(self, char: str) -> None:
+        if self._in_value and self._depth == 1 and self._string is not None:
+            self._string.append(char)
+
+    def _end_key(self) -> None:
+        try:
+            self.current_key = json.loads("".join(self._raw))
+        except ValueError:
+            self._invalid = True
+
+        self._raw = []
+
+    def _end_value(self) -> bool:
+        self._in_value = False
+        self._string = None
+
+        try:
+            self.fields[typing.cast(str, self.current_key)] = json.loads(
+                "".join(self._raw)
+            )
+            return True
+
+        except ValueError:
+            return False
+
+        finally:
+            self._raw = []
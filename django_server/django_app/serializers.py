@@ -1,4 +1,5 @@
 import django_auth.serializers as auth_serializers
+from django.conf import settings
 from rest_framework import serializers
 
 from . import models
@@ -7,7 +8,17 @@ from . import models
 class AIModelVersionSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.AIModelVersion
-        fields: list[str] = ["parameters", "size"]
+        fields: list[str] = ["parameters", "size", "context_window", "replicas"]
+        extra_kwargs = {
+            "context_window": {
+                "min_value": settings.CHAT_MIN_CONTEXT_WINDOW,
+                "max_value": settings.CHAT_MAX_CONTEXT_WINDOW,
+            },
+            "replicas": {
+                "min_value": 1,
+                "max_value": settings.CONTAINER_MAX_REPLICAS,
+            },
+        }
 
     def create(self, validated_data) -> models.AIModelVersion:
         ai_model_version = models.AIModelVersion.objects.create(**validated_data)
@@ -27,6 +38,7 @@ class AIModelSerializer(serializers.ModelSerializer):
             "can_process_image",
             "versions",
             "index",
+            "history_image_turns",
         ]
 
     def create(self, validated_data) -> models.AIModel:
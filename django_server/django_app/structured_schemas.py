@@ -0,0 +1,174 @@
+import hashlib
+import json
+import threading
+import typing
+from collections import OrderedDict
+
+MAX_CACHED_SCHEMAS = 256
+
+VALID_SIMPLE_TYPES = {"string", "number", "bool", "date"}
+
+TYPE_MAPPING = {
+    "string": {"type": "string"},
+    "number": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "date": {"type": "string", "format": "date"},
+}
+
+Validator = typing.Callable[[typing.Any], bool]
+
+
+class StructuredSchema:
+    """
+    Everything a structured request needs that depends only on the field
+    spec: the JSON schema (also sent to Ollama as `format`), the rendered
+    system message and validators compiled once for the whole object and for
+    each top-level field.
+    """
+
+    def __init__(self, json_schema: dict[str, typing.Any]) -> None:
+        self.json_schema = json_schema
+        self.properties: dict[str, dict[str, typing.Any]] = json_schema["properties"]
+        self.system_message = f"""You must respond with JSON that matches the following schema:
+```json
+{json.dumps(json_schema, indent=2)}
+```
+Your response should be valid JSON only, with no other text or explanation."""
+        self.field_validators = {
+            key: compile_validator(field_schema)
+            for key, field_schema in self.properties.items()
+        }
+        self.validate = compile_validator(json_schema)
+
+
+class StructuredSchemaCache:
+    """
+    LRU cache of built schemas keyed by a canonical hash of the field spec,
+    so a frontend sending the same spec on every turn reuses one instance.
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_SCHEMAS) -> None:
+        self._schemas: OrderedDict[str, StructuredSchema] = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def get(self, structured_output: typing.Any) -> StructuredSchema:
+        key = get_schema_key(structured_output)
+
+        with self._lock:
+            if (schema := self._schemas.get(key)) is not None:
+                self._schemas.move_to_end(key)
+                return schema
+
+        schema = StructuredSchema(build_json_schema(structured_output))
+
+        with self._lock:
+            self._schemas[key] = schema
+            self._schemas.move_to_end(key)
+
+            while len(self._schemas) > self._max_size:
+                self._schemas.popitem(last=False)
+
+        return schema
+
+    def clear(self) -> None:
+        with self._lock:
+            self._schemas.clear()
+
+
+def get_schema_key(structured_output: typing.Any) -> str:
+    canonical = json.dumps(structured_output, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def build_json_schema(structured_output) -> dict[str, typing.Any]:
+    properties = {}
+    required_fields = []
+
+    for field_spec in structured_output:
+        field_name = field_spec["field"]
+        field_type = field_spec["type"]
+        required_fields.append(field_name)
+
+        if field_type in VALID_SIMPLE_TYPES:
+            properties[field_name] = TYPE_MAPPING[field_type].copy()
+
+        elif field_type == "array":
+            if "arrayType" not in field_spec or not field_spec["arrayType"]:
+                array_type = "string"
+            else:
+                array_type = field_spec["arrayType"]
+
+            if array_type not in VALID_SIMPLE_TYPES:
+                array_type = "string"
+
+            properties[field_name] = {
+                "type": "array",
+                "items": TYPE_MAPPING[array_type].copy(),
+            }
+
+        else:
+            properties[field_name] = {"type": "string"}
+
+        if "description" in field_spec and field_spec["description"]:
+            properties[field_name]["description"] = field_spec["description"]
+
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": required_fields,
+    }
+
+
+def compile_validator(schema: dict[str, typing.Any]) -> Validator:
+    """
+    Turns the subset of JSON schema produced by `build_json_schema` into a
+    plain predicate, so validating a response does not walk the schema dict.
+    """
+
+    schema_type = schema.get("type")
+
+    if schema_type == "string":
+        return lambda value: isinstance(value, str)
+
+    if schema_type == "number":
+        return lambda value: isinstance(value, (int, float)) and not isinstance(
+            value, bool
+        )
+
+    if schema_type == "boolean":
+        return lambda value: isinstance(value, bool)
+
+    if schema_type == "array":
+        item_validator = compile_validator(schema.get("items", {}))
+
+        return lambda value: isinstance(value, list) and all(
+            item_validator(item) for item in value
+        )
+
+    if schema_type == "object":
+        property_validators = [
+            (key, compile_validator(property_schema))
+            for key, property_schema in schema.get("properties", {}).items()
+        ]
+        required = tuple(schema.get("required", []))
+
+        return (
+            lambda value: isinstance(value, dict)
+            and all(key in value for key in required)
+            and all(
+                validator(value[key])
+                for key, validator in property_validators
+                if key in value
+            )
+        )
+
+    return lambda value: True
+
+
+schema_cache = StructuredSchemaCache()
+
+
+def get_schema(structured_output: typing.Any) -> StructuredSchema:
+    return schema_cache.get(structured_output)
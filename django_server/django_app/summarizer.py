@@ -0,0 +1,123 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from container.router import replica_router
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import functions, history_planner, models, ollama_clients
+
+logger = logging.getLogger(__name__)
+
+MAX_SUMMARIZED_MESSAGE_CHARS = 2_000
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Rewrite the summary so it also covers the new messages below. Keep facts, names, decisions, open questions and anything the assistant promised to do. Answer with the summary text only."""
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summarizer")
+_scheduled_chats: set[int] = set()
+_scheduled_lock = threading.Lock()
+
+
+def maybe_schedule(chat_id: int, model: str, parameters: str) -> None:
+    """
+    Queues a background summary update for the chat when summarisation is
+    enabled. At most one update per chat is queued at a time.
+    """
+
+    if not settings.CHAT_SUMMARY_ENABLED:
+        return
+
+    with _scheduled_lock:
+        if chat_id in _scheduled_chats:
+            return
+
+        _scheduled_chats.add(chat_id)
+
+    _executor.submit(_summarize, chat_id, model, parameters)
+
+
+def _summarize(chat_id: int, model: str, parameters: str) -> None:
+    try:
+        close_old_connections()
+        update_summary(chat_id, model, parameters)
+
+    except Exception:
+        logger.exception("Failed to summarise chat %s", chat_id)
+
+    finally:
+        close_old_connections()
+
+        with _scheduled_lock:
+            _scheduled_chats.discard(chat_id)
+
+
+def update_summary(chat_id: int, model: str, parameters: str) -> bool:
+    if (chat_history := models.ChatHistory.objects.filter(id=chat_id).first()) is None:
+        return False
+
+    messages = functions.get_unsummarized_messages(chat_history)
+    if len(messages) <= settings.CHAT_SUMMARY_THRESHOLD:
+        return False
+
+    to_summarize = messages[: len(messages) - settings.CHAT_SUMMARY_KEEP_RECENT]
+    if not to_summarize:
+        return False
+
+    if (ai_model := functions.get_ai_model(model)) is None:
+        return False
+
+    context_window = functions.get_context_window(ai_model, parameters)
+    header = f"Current summary:\n{chat_history.summary or '(none)'}\n\nNew messages:\n"
+
+    # Only as many messages as fit next to the prompt and the current summary;
+    # Ollama would otherwise cut the front of the prompt, summary included.
+    # The rest are summarised on a later run.
+    entries = history_planner.plan_oldest(
+        [
+            {
+                "role": message.role,
+                "content": f"{message.role.capitalize()}: "
+                f"{message.content[:MAX_SUMMARIZED_MESSAGE_CHARS]}",
+            }
+            for message in to_summarize
+        ],
+        [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": header},
+        ],
+        context_window,
+    )
+    if not entries:
+        return False
+
+    to_summarize = to_summarize[: len(entries)]
+    prompt = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {
+            "role": "user",
+            "content": header + "\n\n".join(entry["content"] for entry in entries),
+        },
+    ]
+
+    # Not admitted through the chat queues: summaries run on one worker for
+    # all chats, so they add at most one generation per server, and a
+    # background task must not hold a place users are waiting for.
+    if (route := replica_router.acquire(model, parameters)) is None:
+        return False
+
+    with route:
+        llm = ollama_clients.get_client(
+            route.base_url, route.model, num_ctx=context_window
+        )
+        summary = llm.invoke(prompt).text().strip()
+
+    if not summary:
+        return False
+
+    models.ChatHistory.objects.filter(id=chat_id).update(
+        summary=summary, summary_until_seq=to_summarize[-1].seq
+    )
+
+    return True
@@ -12,4 +12,5 @@ urlpatterns: list[URLPattern] = [
     path("all-chats/<str:model>", views.AllChats.as_view(), name="all_chats"),
     path("ai-models/", views.AIModels.as_view(), name="ai_models"),
     path("ask-bot/<str:model>/<str:chat_id>", views.AskBot.as_view(), name="ask_bot"),
+    path("images/<str:digest>", views.Image.as_view(), name="image"),
 ]
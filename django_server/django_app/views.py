@@ -1,4 +1,7 @@
+from container.router import replica_router
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.http import HttpResponse, HttpResponseNotModified
 from helpers import decorators
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -7,7 +10,18 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from . import functions, models, scrape_ollama, serializers
+from . import (
+    admission,
+    functions,
+    image_store,
+    models,
+    scrape_ollama,
+    serializers,
+    summarizer,
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 
 class AIModels(APIView):
@@ -82,6 +96,10 @@ class AIModels(APIView):
             "parameters": request_data["parameters"],
             "size": request_data["size"],
         }
+        if "context_window" in request_data:
+            version_data["context_window"] = request_data["context_window"]
+        if "replicas" in request_data:
+            version_data["replicas"] = request_data["replicas"]
         version_serializer = serializers.AIModelVersionSerializer(data=version_data)
 
         if not version_serializer.is_valid():
@@ -148,7 +166,7 @@ class AIModels(APIView):
 
 
 class ChatHistory(APIView):
-    # url: /chat-history/{model}
+    # url: /chat-history/{model}/{chat_id}?before={seq}&limit={limit}
 
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -164,15 +182,49 @@ class ChatHistory(APIView):
         if (
             chat_history := functions.get_chat_history_for_user(user, ai_model, chat_id)
         ) is None:
-            return Response([], status=status.HTTP_200_OK)
+            return Response(
+                {"results": [], "next_before": None}, status=status.HTTP_200_OK
+            )
 
-        deserialized_messages = functions.deserialize_messages(chat_history.history)
+        try:
+            before = request.query_params.get("before", None)
+            limit = min(
+                max(int(request.query_params.get("limit", DEFAULT_PAGE_SIZE)), 1),
+                MAX_PAGE_SIZE,
+            )
+            messages, next_before = functions.get_chat_messages_page(
+                chat_history,
+                before=int(before) if before is not None else None,
+                limit=limit,
+            )
 
-        return Response(deserialized_messages, status=status.HTTP_200_OK)
+        except ValueError:
+            return Response(
+                {
+                    "error": "Invalid 'before' or 'limit' query param",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        deserialized_messages = [
+            {
+                **deserialized_message,
+                "image": functions.get_image_url(request, deserialized_message["image"]),
+                "seq": message.seq,
+            }
+            for message, deserialized_message in zip(
+                messages, functions.deserialize_messages(messages)
+            )
+        ]
+
+        return Response(
+            {"results": deserialized_messages, "next_before": next_before},
+            status=status.HTTP_200_OK,
+        )
 
 
 class AllChats(APIView):
-    # url: /all-chats/{model}
+    # url: /all-chats/{model}?cursor={cursor}&limit={limit}
 
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -186,15 +238,38 @@ class AllChats(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        chat_histories = functions.get_chats_for_user(request.user, ai_model, sort=True)
-        serializer = serializers.ChatHistorySerializer(chat_histories, many=True)
+        try:
+            limit = min(
+                max(int(request.query_params.get("limit", DEFAULT_PAGE_SIZE)), 1),
+                MAX_PAGE_SIZE,
+            )
+            chats, next_cursor = functions.get_chat_list_page(
+                request.user,
+                ai_model,
+                cursor=request.query_params.get("cursor", None),
+                limit=limit,
+            )
 
-        response_data = [
-            {"id": chat["id"], "title": chat["title"]} for chat in serializer.data
-        ]
+        except ValueError:
+            return Response(
+                {
+                    "error": "Invalid 'cursor' or 'limit' query param",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         return Response(
-            response_data,
+            {
+                "results": [
+                    {
+                        "id": chat["id"],
+                        "title": chat["title"],
+                        "last_update_time": chat["last_update_time"],
+                    }
+                    for chat in chats
+                ],
+                "next_cursor": next_cursor,
+            },
             status=status.HTTP_200_OK,
         )
 
@@ -316,22 +391,49 @@ class AskBot(APIView):
         user = request.user
         chat_history = functions.get_chat_history_for_user(user, ai_model, chat_id)
         history_messages = functions.deserialize_messages(
-            chat_history.history if chat_history else []
+            functions.get_unsummarized_messages(chat_history)
         )
 
         user_question = request_data["message"]
         image = request_data.get("image", "")
         model_parameters = request.query_params["parameters"]
 
-        if not (
-            bot_response := functions.ask_bot(
+        # Shares the per-model concurrency limit with WebSocket chats.
+        try:
+            slot = admission.acquire_blocking(
+                admission.get_queue_key(ai_model.model, model_parameters),
+                user.id,
+                replicas=replica_router.get_replica_count(
+                    ai_model.model, model_parameters
+                ),
+            )
+
+        except admission.QueueFullError as e:
+            response = Response(
+                {
+                    "error": f"The model is busy. Try again in {e.retry_after} seconds.",
+                    "retry_after": e.retry_after,
+                },
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            response["Retry-After"] = str(e.retry_after)
+
+            return response
+
+        try:
+            bot_response = functions.ask_bot(
                 ai_model,
                 model_parameters,
                 user_question,
                 image,
                 history_messages,
+                summary=chat_history.summary if chat_history else "",
             )
-        ):
+
+        finally:
+            admission.release_blocking(slot)
+
+        if not bot_response:
             return Response(
                 {
                     "error": "Failed to get response from bot",
@@ -344,7 +446,12 @@ class AskBot(APIView):
                 functions.create_message("user", user_question, image),
                 functions.create_message("assistant", bot_response),
             ]
-            functions.add_messages_to_history(user, ai_model, chat_history, messages)
+            saved_messages = functions.add_messages_to_history(
+                user, ai_model, chat_history, messages
+            )
+            summarizer.maybe_schedule(
+                saved_messages[0].chat_id, ai_model.model, model_parameters
+            )
 
         except Exception as e:
             return Response(
@@ -361,3 +468,35 @@ class AskBot(APIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+class Image(APIView):
+    # url: /images/{digest}
+
+    # Plain <img> tags cannot send the JWT header, so access is granted by the
+    # signed token that ChatHistory.get puts in the URLs of the owner's
+    # messages. Without it, whether an image exists is not revealed.
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request: Request, digest: str) -> HttpResponse:
+        token = request.query_params.get("token", "")
+        if not image_store.check_url_token(digest, token):
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+
+        if request.headers.get("If-None-Match", "").strip('"') == digest:
+            response = HttpResponseNotModified()
+            response["ETag"] = f'"{digest}"'
+
+            return response
+
+        if (image_bytes := image_store.load_image(digest)) is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        response = HttpResponse(
+            image_bytes, content_type=image_store.get_content_type(image_bytes)
+        )
+        response["ETag"] = f'"{digest}"'
+        response["Cache-Control"] = f"private, max-age={settings.IMAGE_URL_MAX_AGE}"
+
+        return response
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+import container.routing as container_routing
 import django_app.routing as app_routing
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
@@ -22,7 +23,12 @@ application = ProtocolTypeRouter(
     {
         "http": get_asgi_application(),
         "websocket": AllowedHostsOriginValidator(
-            TokenAuthMiddlewareStack(URLRouter(app_routing.websocket_urlpatterns))
+            TokenAuthMiddlewareStack(
+                URLRouter(
+                    app_routing.websocket_urlpatterns
+                    + container_routing.websocket_urlpatterns
+                )
+            )
         ),
     }
 )
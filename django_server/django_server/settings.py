@@ -110,6 +110,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "container.middleware.DockerApiCallsMiddleware",
 ]
 
 ROOT_URLCONF = "django_server.urls"
@@ -133,6 +134,56 @@ TEMPLATES = [
 WSGI_APPLICATION = "django_server.wsgi.application"
 
 
+# Containers
+CONTAINER_PORT_CACHE_TTL = int(os.getenv("CONTAINER_PORT_CACHE_TTL", 300))
+CONTAINER_JOB_WORKERS = int(os.getenv("CONTAINER_JOB_WORKERS", 2))
+# Host ports handed out to Ollama containers; kept clear of the 11434 + index
+# ports used by containers started by hand.
+CONTAINER_PORT_RANGE_START = int(os.getenv("CONTAINER_PORT_RANGE_START", 12000))
+CONTAINER_PORT_RANGE_END = int(os.getenv("CONTAINER_PORT_RANGE_END", 12199))
+# How long a port found taken by something else is skipped.
+CONTAINER_PORT_CONFLICT_TTL = int(os.getenv("CONTAINER_PORT_CONFLICT_TTL", 3600))
+# Containers without a chat for this many seconds are stopped; 0 keeps them.
+CONTAINER_IDLE_TTL = int(os.getenv("CONTAINER_IDLE_TTL", 1800))
+# Summed size of the models of running containers; 0 means no limit.
+CONTAINER_MEMORY_BUDGET_GB = float(os.getenv("CONTAINER_MEMORY_BUDGET_GB", 0))
+CONTAINER_REAPER_INTERVAL = int(os.getenv("CONTAINER_REAPER_INTERVAL", 60))
+# Most containers one model version may run; each one requests every GPU.
+CONTAINER_MAX_REPLICAS = int(os.getenv("CONTAINER_MAX_REPLICAS", 4))
+# Model versions kept loaded ahead of requests; 0 turns pre-warming off.
+CONTAINER_PREWARM_TOP_K = int(os.getenv("CONTAINER_PREWARM_TOP_K", 0))
+CONTAINER_PREWARM_INTERVAL = int(os.getenv("CONTAINER_PREWARM_INTERVAL", 120))
+# How long Ollama keeps pre-warmed weights loaded, e.g. "30m" or "-1".
+CONTAINER_PREWARM_KEEP_ALIVE = os.getenv("CONTAINER_PREWARM_KEEP_ALIVE", "30m")
+# Seconds after which a request counts half as much towards the request rate.
+CONTAINER_PREWARM_RATE_HALF_LIFE = int(
+    os.getenv("CONTAINER_PREWARM_RATE_HALF_LIFE", 900)
+)
+# A generation that spent this long loading the model counts as cold.
+CONTAINER_PREWARM_COLD_LOAD_MS = int(os.getenv("CONTAINER_PREWARM_COLD_LOAD_MS", 500))
+
+
+# Chat
+CHAT_SUMMARY_ENABLED = os.getenv("CHAT_SUMMARY_ENABLED", "false").lower() == "true"
+# Summarise once a chat has more unsummarised messages than this...
+CHAT_SUMMARY_THRESHOLD = int(os.getenv("CHAT_SUMMARY_THRESHOLD", 40))
+# ...keeping this many of the most recent ones verbatim.
+CHAT_SUMMARY_KEEP_RECENT = int(os.getenv("CHAT_SUMMARY_KEEP_RECENT", 10))
+# Allowed num_ctx of model versions.
+CHAT_MIN_CONTEXT_WINDOW = int(os.getenv("CHAT_MIN_CONTEXT_WINDOW", 512))
+CHAT_MAX_CONTEXT_WINDOW = int(os.getenv("CHAT_MAX_CONTEXT_WINDOW", 131072))
+# Streamed tokens are sent in one WebSocket frame once this many bytes are
+# pending or this many milliseconds passed. 0 sends every chunk on its own.
+CHAT_FRAME_MAX_BYTES = int(os.getenv("CHAT_FRAME_MAX_BYTES", 256))
+CHAT_FRAME_MAX_DELAY_MS = int(os.getenv("CHAT_FRAME_MAX_DELAY_MS", 40))
+# Generations running at once per replica of a model:parameters version, and
+# how many more may wait before new ones are turned away.
+CHAT_MAX_CONCURRENT_PER_MODEL = int(os.getenv("CHAT_MAX_CONCURRENT_PER_MODEL", 2))
+CHAT_MAX_QUEUED_PER_MODEL = int(os.getenv("CHAT_MAX_QUEUED_PER_MODEL", 16))
+# Suggested wait for rejected requests until generation times are known.
+CHAT_QUEUE_RETRY_AFTER_SECONDS = int(os.getenv("CHAT_QUEUE_RETRY_AFTER_SECONDS", 10))
+
+
 # Database
 LOCAL_DATABASE_HOST = os.getenv("LOCAL_DATABASE_HOST")
 DOCKER_DATABASE_HOST = os.getenv("DOCKER_DATABASE_HOST")
@@ -201,6 +252,12 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Content-addressed store for images sent in chats
+IMAGE_STORE_ROOT = Path(os.getenv("IMAGE_STORE_ROOT", BASE_DIR / "media" / "images"))
+# Seconds a signed image URL handed out with chat history stays the same; each
+# URL is then accepted for one more such period.
+IMAGE_URL_MAX_AGE = int(os.getenv("IMAGE_URL_MAX_AGE", 3600))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
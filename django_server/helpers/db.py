@@ -0,0 +1,31 @@
+from django.db import IntegrityError
+
+# Mongo's error code for a write that breaks a unique index.
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+def is_duplicate_key_error(error: BaseException) -> bool:
+    """
+    Whether a failed write broke a unique index. djongo does not turn Mongo's
+    duplicate key errors into IntegrityError: they arrive as a SQLDecodeError,
+    a ValueError, raised from pymongo's DuplicateKeyError or BulkWriteError.
+    """
+
+    current: BaseException | None = error
+    while current is not None:
+        if isinstance(current, IntegrityError):
+            return True
+
+        if getattr(current, "code", None) == DUPLICATE_KEY_ERROR_CODE:
+            return True
+
+        details = getattr(current, "details", None)
+        if isinstance(details, dict) and any(
+            write_error.get("code") == DUPLICATE_KEY_ERROR_CODE
+            for write_error in details.get("writeErrors", [])
+        ):
+            return True
+
+        current = current.__cause__
+
+    return False
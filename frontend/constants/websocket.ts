@@ -3,6 +3,8 @@ export interface WebsocketMessage {
   ai_model: string
   ai_model_parameters: string
   image?: string
+  compact?: boolean
+  resend_full?: boolean
   structured_output?: {
     field: string
     type: string
@@ -10,9 +12,42 @@ export interface WebsocketMessage {
 }
 
 export interface WebsocketResponse {
-  message: string
+  // Left out of the final frame unless the text was not streamed as-is
+  // (structured output) or the message asked for `resend_full: true`.
+  message?: string
   done: boolean
   error?: string
+  // Streamed structured answers: `deltas` is text appended to string fields,
+  // `fields` holds complete values of the other fields.
+  deltas?: Record<string, string>
+  fields?: Record<string, any>
+  context?: Record<string, any>
+  cancelled?: boolean
+  // Set on the error rejecting a message sent while an answer is generated;
+  // that generation keeps running.
+  busy?: boolean
+  queue_position?: number
+  // Sent while the model's container is started on demand.
+  status?: 'starting' | 'pulling' | 'loading'
+  progress?: number
+  chat_id?: number
+  seq?: number
+  usage?: {
+    input_tokens?: number
+    output_tokens?: number
+    total_tokens?: number
+  }
+  timings?: {
+    startup_ms: number
+    queued_ms: number
+    first_token_ms: number | null
+    total_ms: number
+  }
+}
+
+// Compact token frame sent when the message asked for `compact: true`.
+interface CompactWebsocketResponse {
+  m: string
 }
 
 export interface WebsocketHandlers {
@@ -20,12 +55,13 @@ export interface WebsocketHandlers {
   onDisconnect: () => void
   onSendMessage: (message: WebsocketMessage) => void
   onReceiveMessage: (data: WebsocketResponse) => void
-  onError?: (message: string) => void
+  onError?: (message: string, data: WebsocketResponse) => void
   onReconnecting?: (attempt: number) => void
 }
 
 export interface WebSocketWrapper extends WebSocket {
   sendMessage: (message: WebsocketMessage) => void
+  cancelGeneration: () => void
   closeConnection: () => void
 }
 
@@ -87,6 +123,10 @@ export function getWebsocket(handlers: WebsocketHandlers, roomId: string): WebSo
               console.warn('WebSocket is not open. Message not sent:', message)
             }
           }
+          extendedSocket.cancelGeneration = () => {
+            if (newSocket.readyState === WebSocket.OPEN)
+              newSocket.send(JSON.stringify({ type: 'cancel' }))
+          }
           extendedSocket.closeConnection = () => {
             intentionallyClosed = true
             if (reconnectTimer)
@@ -100,10 +140,13 @@ export function getWebsocket(handlers: WebsocketHandlers, roomId: string): WebSo
 
     ws.addEventListener('message', (event) => {
       try {
-        const data: WebsocketResponse = JSON.parse(event.data)
+        const parsed: WebsocketResponse | CompactWebsocketResponse = JSON.parse(event.data)
+        const data: WebsocketResponse = 'm' in parsed
+          ? { message: parsed.m, done: false }
+          : parsed
 
         if (data.error) {
-          handlers.onError?.(data.error)
+          handlers.onError?.(data.error, data)
           return
         }
 
@@ -130,6 +173,11 @@ export function getWebsocket(handlers: WebsocketHandlers, roomId: string): WebSo
     }
   }
 
+  extendedSocket.cancelGeneration = () => {
+    if (socket.readyState === WebSocket.OPEN)
+      socket.send(JSON.stringify({ type: 'cancel' }))
+  }
+
   extendedSocket.closeConnection = () => {
     intentionallyClosed = true
     if (reconnectTimer)
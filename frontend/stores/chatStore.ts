@@ -11,6 +11,8 @@ export const useChatStore = defineStore('chat', () => {
     }[]
   }>({})
   const allChats = ref<{ [model: string]: { id: string, title: string }[] }>({})
+  const allChatsNextCursor = ref<{ [model: string]: string | null }>({})
+  const chatHistoryNextBefore = ref<{ [model: string]: number | null }>({})
 
   const sendingMessage = ref(false)
   const loading = ref(false)
@@ -22,6 +24,7 @@ export const useChatStore = defineStore('chat', () => {
   const resetState = () => {
     aiModels.value = []
     chatHistoryPerModel.value = {}
+    chatHistoryNextBefore.value = {}
     sendingMessage.value = false
   }
 
@@ -66,14 +69,17 @@ export const useChatStore = defineStore('chat', () => {
     }
   }
 
-  const fetchAllChats = async (model: string) => {
+  const fetchAllChats = async (model: string, cursor: string | null = null) => {
     const url = `all-chats/${model}`
 
     try {
-      const response = await api.value.get(url, { params: { model } })
+      const response = await api.value.get(url, { params: cursor ? { cursor } : {} })
 
       if (response?.status === 200) {
-        allChats.value[model] = response.data
+        const chats = response.data.results.map(({ id, title }: { id: string, title: string }) => ({ id, title }))
+
+        allChats.value[model] = cursor ? [...(allChats.value[model] || []), ...chats] : chats
+        allChatsNextCursor.value[model] = response.data.next_cursor
       }
     }
     catch (error: any) {
@@ -82,14 +88,26 @@ export const useChatStore = defineStore('chat', () => {
     }
   }
 
-  const fetchChatHistory = async (model: string, chatId: string) => {
+  const fetchMoreChats = async (model: string) => {
+    const cursor = allChatsNextCursor.value[model]
+
+    if (cursor)
+      await fetchAllChats(model, cursor)
+  }
+
+  const fetchChatHistory = async (model: string, chatId: string, before: number | null = null) => {
     const url = `chat-history/${model}/${chatId}`
 
     try {
-      const response = await api.value.get(url, { params: { model } })
+      const response = await api.value.get(url, { params: before !== null ? { before } : {} })
 
       if (response?.status === 200) {
-        chatHistoryPerModel.value[model] = response.data
+        const messages = response.data.results
+
+        chatHistoryPerModel.value[model] = before !== null
+          ? [...messages, ...(chatHistoryPerModel.value[model] || [])]
+          : messages
+        chatHistoryNextBefore.value[model] = response.data.next_before
       }
     }
     catch (error: any) {
@@ -98,6 +116,13 @@ export const useChatStore = defineStore('chat', () => {
     }
   }
 
+  const fetchOlderMessages = async (model: string, chatId: string) => {
+    const before = chatHistoryNextBefore.value[model]
+
+    if (before !== null && before !== undefined)
+      await fetchChatHistory(model, chatId, before)
+  }
+
   const askBot = async (model: string, parameters: string, chatId: string, message: string, image: string) => {
     const url = `ask-bot/${model}/${chatId}?parameters=${parameters}`
 
@@ -207,13 +232,17 @@ export const useChatStore = defineStore('chat', () => {
     aiModels,
     chatHistoryPerModel,
     allChats,
+    allChatsNextCursor,
+    chatHistoryNextBefore,
     sendingMessage,
     loading,
     resetState,
     fetchAIModels,
     pullAIModels,
     fetchAllChats,
+    fetchMoreChats,
     fetchChatHistory,
+    fetchOlderMessages,
     askBot,
     createChat,
     deleteChat,
@@ -7,6 +7,19 @@ export interface Container {
   environment: any
 }
 
+export type JobStatus = 'queued' | 'running' | 'completed' | 'failed'
+
+export interface ContainerJob {
+  id: string
+  kind: string
+  status: JobStatus
+  progress: any
+  result: any
+  error: string | null
+}
+
+const JOB_POLL_INTERVAL_MS = 1000
+
 export const useContainerStore = defineStore('container', () => {
   const apiStore = useApiStore()
   const snackbarStore = useSnackbarStore()
@@ -14,10 +27,38 @@ export const useContainerStore = defineStore('container', () => {
 
   const containers = ref<Container[]>([])
   const loadingOperation = ref<string | null>(null)
+  const jobs = ref<{ [jobId: string]: ContainerJob }>({})
 
   const resetState = () => {
     containers.value = []
     loadingOperation.value = null
+    jobs.value = {}
+  }
+
+  const waitForJob = async (job: ContainerJob) => {
+    const url = `/docker/jobs/${job.id}`
+
+    jobs.value[job.id] = job
+
+    while (jobs.value[job.id] && !['completed', 'failed'].includes(jobs.value[job.id].status)) {
+      await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+
+      try {
+        const response = await api.value.get(url)
+
+        if (response.status === 200)
+          jobs.value[job.id] = response.data
+      }
+      catch (error: any) {
+        console.error(error)
+        break
+      }
+    }
+
+    const finishedJob = jobs.value[job.id]
+    delete jobs.value[job.id]
+
+    return finishedJob
   }
 
   const checkDockerConnection = async () => {
@@ -60,7 +101,15 @@ export const useContainerStore = defineStore('container', () => {
     try {
       const response = await api.value.post(url, {})
 
-      if (response.status === 200) {
+      if (response.status === 202) {
+        await getUserContainers()
+
+        const job = await waitForJob(response.data.job)
+        if (job?.status === 'failed')
+          snackbarStore.showSnackbarError(job.error || `Failed to start container for ${aiModel.model}.`)
+      }
+
+      if (response.status === 200 || response.status === 202) {
         await getUserContainers()
       }
     }
@@ -123,6 +172,7 @@ export const useContainerStore = defineStore('container', () => {
   return {
     containers,
     loadingOperation,
+    jobs,
     resetState,
     checkDockerConnection,
     getUserContainers,